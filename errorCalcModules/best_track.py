@@ -0,0 +1,213 @@
+"""
+CREATED: 17/10/2026
+
+Summary: Lazily initialised, disk cached HURDAT2 best track store.
+
+Parsing the full Atlantic HURDAT2 text file is slow, so it is done once and the
+result is written to a cache directory as flat columnar numpy arrays keyed by a
+hash of the HURDAT2 file. Every later load memory maps those arrays, so
+importing track_error (or starting a worker process) does no parsing at all and
+the parse only ever happens the first time a best track is actually requested.
+
+The HURDAT2 file is found from the HURDAT2 environment variable, falling back to
+HURDAT2.txt in this directory. The cache lives in HURDAT2_CACHE, falling back to
+~/.cache/hurdat2.
+"""
+# Imports
+import hashlib
+import os
+import shutil
+import tempfile
+import numpy as np
+
+#############
+## GLOBALS ##
+#############
+
+HURDAT2_PATH = os.environ.get('HURDAT2', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'HURDAT2.txt'))
+CACHE_DIR = os.environ.get('HURDAT2_CACHE', os.path.join(os.path.expanduser('~'), '.cache', 'hurdat2'))
+
+# columnar arrays stored per entry, all storms concatenated
+COLUMNS = ['time', 'lat', 'lon', 'mslp', 'vmax']
+
+# one store per HURDAT2 path, built on first use
+_STORES = {}
+
+###############
+## FUNCTIONS ##
+###############
+
+def file_hash(filepath, blocksize=2**20):
+    """ Returns the sha1 hex digest of a file's contents
+
+    Parameters
+    ----------
+    filepath : str
+        path to file
+
+    Returns
+    -------
+    digest : str
+        sha1 hex digest
+    """
+    sha = hashlib.sha1()
+    with open(filepath, 'rb') as fid:
+        for block in iter(lambda: fid.read(blocksize), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def _coord(text):
+    """ Converts a HURDAT2 coordinate string (e.g. 15.6N, 50.5W) to a signed float """
+    text = text.strip()
+    value = float(text[:-1])
+    return -value if text[-1] in 'SW' else value
+
+
+def parse_hurdat2(filepath):
+    """ Parses a HURDAT2 text file into columnar arrays
+
+    Storms are concatenated in file order. Entries for storm i are
+    offsets[i]:offsets[i+1] of each of the column arrays. Missing pressures
+    and winds (-999) are stored as NaN.
+
+    Parameters
+    ----------
+    filepath : str
+        path to HURDAT2 text file
+
+    Returns
+    -------
+    arrays : dict
+        ids, names, offsets and the COLUMNS arrays
+    """
+    ids, names, offsets = [], [], [0]
+    times, lats, lons, mslps, vmaxs = [], [], [], [], []
+    with open(filepath) as fid:
+        for line in fid:
+            fields = [f.strip() for f in line.split(',')]
+            if len(fields) < 4:
+                continue
+            # header lines look like AL092020, LAURA, 57,
+            if fields[0][:2].isalpha():
+                ids.append(fields[0])
+                names.append(fields[1])
+                offsets.append(offsets[-1])
+                continue
+            times.append(f'{fields[0][:4]}-{fields[0][4:6]}-{fields[0][6:8]}T{fields[1][:2]}:{fields[1][2:4]}')
+            lats.append(_coord(fields[4]))
+            lons.append(_coord(fields[5]))
+            vmaxs.append(float(fields[6]))
+            mslps.append(float(fields[7]))
+            offsets[-1] += 1
+    arrays = {
+        'ids' : np.array(ids, dtype='U8'),
+        'names' : np.array(names, dtype='U16'),
+        'offsets' : np.array(offsets, dtype=np.int64),
+        'time' : np.array(times, dtype='datetime64[m]'),
+        'lat' : np.array(lats, dtype=np.float32),
+        'lon' : np.array(lons, dtype=np.float32),
+        'mslp' : np.array(mslps, dtype=np.float32),
+        'vmax' : np.array(vmaxs, dtype=np.float32),
+    }
+    for var in ['mslp', 'vmax']:
+        arrays[var][arrays[var] <= -999] = np.nan
+    return arrays
+
+
+def _write_cache(arrays, cache_path):
+    """ Writes the parsed arrays to cache_path as .npy files
+
+    Written to a temporary directory which is then renamed into place, so
+    concurrent workers never see a half written cache.
+    """
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    tmpdir = tempfile.mkdtemp(dir=os.path.dirname(cache_path))
+    try:
+        for key, arr in arrays.items():
+            np.save(os.path.join(tmpdir, key + '.npy'), arr)
+        os.rename(tmpdir, cache_path)
+    except OSError:
+        # another process got there first
+        shutil.rmtree(tmpdir, ignore_errors=True)
+        if not os.path.isdir(cache_path):
+            raise
+
+
+def get_store(filepath=None):
+    """ Returns the (lazily created) BestTrackStore for a HURDAT2 file
+
+    Parameters
+    ----------
+    filepath : str, optional
+        path to HURDAT2 text file, defaults to HURDAT2_PATH
+
+    Returns
+    -------
+    store : BestTrackStore
+    """
+    filepath = HURDAT2_PATH if filepath is None else filepath
+    if filepath not in _STORES:
+        _STORES[filepath] = BestTrackStore(filepath)
+    return _STORES[filepath]
+
+
+#############
+## CLASSES ##
+#############
+
+class BestTrackStore:
+    """ Columnar best track store backed by memory mapped cache files
+
+    Attributes
+    ----------
+        filepath : str
+            HURDAT2 text file the store was built from
+        digest : str
+            sha1 of filepath, used as the cache key
+        ids : np.ndarray
+            ATCF storm IDs (e.g. AL092020) in file order
+        names : np.ndarray
+            storm names in file order (e.g. LAURA)
+    """
+    def __init__(self, filepath, cache_dir=None):
+        self.filepath = filepath
+        self.digest = file_hash(filepath)
+        cache_path = os.path.join(CACHE_DIR if cache_dir is None else cache_dir, self.digest)
+        if not os.path.isdir(cache_path):
+            _write_cache(parse_hurdat2(filepath), cache_path)
+        self._arrays = {key : np.load(os.path.join(cache_path, key + '.npy'), mmap_mode='r')
+                        for key in ['ids', 'names', 'offsets'] + COLUMNS}
+        self.ids = self._arrays['ids']
+        self.names = self._arrays['names']
+        self._index = {storm_id : idx for idx, storm_id in enumerate(self.ids.tolist())}
+
+    def __contains__(self, storm_id):
+        return storm_id in self._index
+
+    def __getitem__(self, storm_id):
+        """ Returns dict of zero copy array views for a storm ID """
+        idx = self._index[storm_id]
+        start, end = self._arrays['offsets'][idx], self._arrays['offsets'][idx+1]
+        return {col : self._arrays[col][start:end] for col in COLUMNS}
+
+    def lookup(self, name, year):
+        """ Returns the storm ID for a named storm in a given year
+
+        Parameters
+        ----------
+        name : str
+            storm name, case insensitive
+        year : int or str
+            year of storm
+
+        Returns
+        -------
+        storm_id : str
+        """
+        name = name.upper()
+        year = str(year)
+        for storm_id, storm_name in zip(self.ids.tolist(), self.names.tolist()):
+            if storm_id[-4:] == year and storm_name == name:
+                return storm_id
+        raise KeyError(f'{name} {year} not in {self.filepath}')
@@ -0,0 +1,166 @@
+"""
+CREATED: 17/10/2026
+
+Summary: Persistent, content addressed cache of computed Cyclone objects.
+
+Building a Cyclone re-reads every csv in the storm directory, looks up the
+best track and recomputes every error. The result only depends on the csv
+files, the HURDAT2 file and the MEMBERS and MAX_GAP settings, so it is saved
+under a key made from all of them and loaded straight back next time. Changing any
+input changes the key, so stale entries are never used (they can be deleted).
+
+Cyclones are stored as a single .npz of flat columnar arrays (tracks are
+concatenated with offsets), so loading needs no csv parsing at all.
+
+The cache lives in CYCLONE_CACHE, falling back to ~/.cache/hurricane-verification.
+"""
+# Imports
+import hashlib
+import os
+import tempfile
+import numpy as np
+import best_track as hurdat
+import track_error as te
+
+#############
+## GLOBALS ##
+#############
+
+CACHE_DIR = os.environ.get('CYCLONE_CACHE', os.path.join(os.path.expanduser('~'), '.cache', 'hurricane-verification'))
+
+# bump when the stored layout changes so old entries are not read
+CACHE_VERSION = 3
+
+COLUMNS = ['time', 'lat', 'lon', 'mslp', 'vmax']
+ERRORS = ['track_error', 'intensity_error']
+
+# per track float64 means, kept as the float32 errors would not reproduce them
+MEANS = ['mean_terror', 'mean_ierror']
+
+###############
+## FUNCTIONS ##
+###############
+
+def cache_key(dirpath):
+    """ Content hash of everything a Cyclone for dirpath is computed from
+
+    Parameters
+    ----------
+        dirpath : str
+            path to directory containing cyclone csvs
+
+    Returns
+    -------
+        key : str
+            sha1 hex digest of the csv file hashes, the HURDAT2 hash, MEMBERS and MAX_GAP
+    """
+    sha = hashlib.sha1(f'v{CACHE_VERSION}'.encode())
+    for filename in sorted(os.listdir(dirpath)):
+        sha.update(filename.encode())
+        sha.update(hurdat.file_hash(os.path.join(dirpath, filename)).encode())
+    sha.update(hurdat.get_store(te.HURDAT2_PATH).digest.encode())
+    sha.update(','.join(te.MEMBERS).encode())
+    sha.update(str(te.MAX_GAP).encode())
+    return sha.hexdigest()
+
+
+def _track_arrays(tracks, prefix):
+    """ Concatenates a list of Tracks into flat arrays with offsets """
+    arrays = {f'{prefix}_offsets' : np.cumsum([0] + [len(track) for track in tracks])}
+    for col in COLUMNS + ERRORS:
+        parts = [getattr(track, col) for track in tracks]
+        if any(part is None for part in parts):
+            continue
+        arrays[f'{prefix}_{col}'] = np.concatenate(parts) if parts else np.array([])
+    if f'{prefix}_{ERRORS[0]}' in arrays:
+        for col in MEANS:
+            arrays[f'{prefix}_{col}'] = np.array([getattr(track, col) for track in tracks], dtype=np.float64)
+    return arrays
+
+
+def _split_tracks(arrays, prefix):
+    """ Inverse of _track_arrays """
+    offsets = arrays[f'{prefix}_offsets']
+    has_errors = f'{prefix}_{ERRORS[0]}' in arrays
+    tracks = []
+    for idx, (start, end) in enumerate(zip(offsets[:-1], offsets[1:])):
+        cols = [arrays[f'{prefix}_{col}'][start:end] for col in COLUMNS]
+        errs = [arrays[f'{prefix}_{col}'][start:end] for col in ERRORS] if has_errors else [None, None]
+        track = te.Track.from_arrays(*cols, *errs)
+        if has_errors:
+            # from_arrays would take the means from the float32 errors
+            for col in MEANS:
+                setattr(track, col, float(arrays[f'{prefix}_{col}'][idx]))
+        tracks.append(track)
+    return tracks
+
+
+def save_cyclone(cyclone, filepath):
+    """ Writes a Cyclone to filepath as columnar .npz
+
+    Written to a temporary file then renamed into place so a crash never
+    leaves a truncated cache entry behind.
+
+    Parameters
+    ----------
+        cyclone : Cyclone
+        filepath : str
+    """
+    arrays = {'name' : np.array(cyclone.name), 'year' : np.array(cyclone.year)}
+    arrays.update(_track_arrays(cyclone.ecmwf.runs, 'ecmwf'))
+    arrays.update(_track_arrays([cyclone.best_track], 'best_track'))
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    fd, tmpname = tempfile.mkstemp(dir=os.path.dirname(filepath), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as fid:
+            np.savez(fid, **arrays)
+        # mkstemp creates files 0600, give the usual permissions before the rename
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(tmpname, 0o666 & ~umask)
+        os.replace(tmpname, filepath)
+    except BaseException:
+        os.remove(tmpname)
+        raise
+
+
+def load_cyclone(filepath):
+    """ Reads a Cyclone written by save_cyclone
+
+    Parameters
+    ----------
+        filepath : str
+
+    Returns
+    -------
+        cyclone : Cyclone
+    """
+    with np.load(filepath) as npz:
+        arrays = dict(npz)
+    runs = _split_tracks(arrays, 'ecmwf')
+    best_track = _split_tracks(arrays, 'best_track')[0]
+    return te.Cyclone(str(arrays['name']), int(arrays['year']), te.Model(runs), best_track)
+
+
+def cached_cyclone(dirpath, cache_dir=None):
+    """ Drop in replacement for generate_cyclone backed by the cache
+
+    Parameters
+    ----------
+        dirpath : str
+            path to directory containing cyclone csvs
+        cache_dir : str, optional
+            defaults to CACHE_DIR
+
+    Returns
+    -------
+         : Cyclone
+            Cyclone object for storm in directory (None if it can't be built)
+    """
+    filepath = os.path.join(CACHE_DIR if cache_dir is None else cache_dir, cache_key(dirpath) + '.npz')
+    if os.path.isfile(filepath):
+        return load_cyclone(filepath)
+    cyclone = te.generate_cyclone(dirpath)
+    if cyclone is not None:
+        save_cyclone(cyclone, filepath)
+    return cyclone
@@ -0,0 +1,307 @@
+"""
+CREATED: 17/10/2026
+
+Summary: Ensemble aware scores of forecast tracks against the best track.
+
+Model.mean_errors only scores each member on its own. The scores here verify
+the ensemble distribution as a whole, at every (init, lead):
+
+    * energy score of the 2-D (great circle) position distribution,
+    * CRPS of central pressure and maximum wind,
+    * rank histograms of central pressure and maximum wind.
+
+Everything works on the dense (init, member, lead) arrays of EnsembleTracks.
+The spread terms need every pair of members. They are not looped over in
+Python:
+    * the CRPS uses the sorted member identity, which is O(m log m);
+    * the energy score takes the Gram matrix of the member unit vectors,
+      one batched matmul per block of (init, lead) points, which gives all
+      pairwise great circle distances at once.
+Members with no fix at a point are left out of that point.
+
+By default the ensemble is the 51 EPS members (ensemble_tracks.ENS_ONLY).
+ECMF, the deterministic high-res run, is not exchangeable with them and
+would skew the spread and rank statistics, pass members to include it.
+"""
+# Imports
+import os
+import sys
+import numpy as np
+import pandas as pd
+import track_error as te
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'tcdata_python'))
+from TropCy.geodesy import EARTH_RADIUS, haversine
+
+#############
+## GLOBALS ##
+#############
+
+INTENSITY = ['mslp', 'vmax']
+
+# (point, member, member) entries per batched Gram matrix, bounds the memory used
+PAIR_CHUNK = 2**22
+
+###############
+## FUNCTIONS ##
+###############
+
+def crps_ensemble(ens, obs, axis=1):
+    """ CRPS of an ensemble against an observation, E|X - y| - E|X - X'| / 2
+
+    E|X - X'| is taken from the sorted members as 2/m^2 sum (2i - m - 1) x_(i)
+    so no member pairs are formed.
+
+    Parameters
+    ----------
+        ens : np.ndarray
+            ensemble values, members along axis, NaN where missing
+        obs : np.ndarray
+            observations, shape of ens without axis
+        axis : int, optional
+            member axis
+
+    Returns
+    -------
+        crps : np.ndarray
+            shape of obs, NaN where obs is or there are no members
+    """
+    x = np.moveaxis(np.asarray(ens, dtype=np.float64), axis, -1)
+    y = np.asarray(obs, dtype=np.float64)
+    m = np.isfinite(x).sum(axis=-1)
+    rank = np.arange(1, x.shape[-1] + 1)
+    weights = np.where(rank <= m[..., None], 2 * rank - m[..., None] - 1, 0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        skill = np.nansum(np.abs(x - y[..., None]), axis=-1) / m
+        spread = 2 * np.sum(weights * np.nan_to_num(np.sort(x, axis=-1)), axis=-1) / m**2
+    crps = skill - 0.5 * spread
+    crps[(m == 0) | np.isnan(y)] = np.nan
+    return crps
+
+
+def _unit_vectors(lat, lon):
+    phi, lam = np.deg2rad(lat), np.deg2rad(lon)
+    return np.stack([np.cos(phi) * np.cos(lam), np.cos(phi) * np.sin(lam), np.sin(phi)], axis=-1)
+
+
+def mean_pairwise_distance(lat, lon, axis=1):
+    """ Mean great circle distance (km) between all pairs of members, E||X - X'||
+
+    Pairwise distances come from batched Gram matrices of the member unit
+    vectors, the chord length |u - v|^2 = 2 - 2 u.v giving the arc
+    2 R arcsin(|u - v| / 2).
+
+    Parameters
+    ----------
+        lat, lon : np.ndarray
+            member positions along axis, NaN where missing
+        axis : int, optional
+            member axis
+
+    Returns
+    -------
+        : np.ndarray
+            shape of lat without axis, NaN where there are no members
+    """
+    lat = np.moveaxis(np.asarray(lat, dtype=np.float64), axis, -1)
+    lon = np.moveaxis(np.asarray(lon, dtype=np.float64), axis, -1)
+    present = np.isfinite(lat) & np.isfinite(lon)
+    nmem = lat.shape[-1]
+    vec = _unit_vectors(np.where(present, lat, 0), np.where(present, lon, 0)) * present[..., None]
+    vec = vec.reshape(-1, nmem, 3)
+    mask = present.reshape(-1, nmem).astype(np.float64)
+    total = np.empty(len(vec))
+    chunk = max(PAIR_CHUNK // max(nmem * nmem, 1), 1)
+    for start in range(0, len(vec), chunk):
+        block = slice(start, start + chunk)
+        chord2 = 2 - 2 * (vec[block] @ vec[block].transpose(0, 2, 1))
+        np.clip(chord2, 0, 4, out=chord2)
+        dist = 2 * EARTH_RADIUS * np.arcsin(np.sqrt(chord2) / 2)
+        # missing members are zero vectors, their pairs are weighted out
+        total[block] = np.einsum('bij,bi,bj->b', dist, mask[block], mask[block])
+    m = present.sum(axis=-1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return total.reshape(m.shape) / m**2
+
+
+def energy_score(lat, lon, obs_lat, obs_lon, axis=1):
+    """ Energy score of ensemble positions against observed positions (km)
+
+    ES = E||X - y|| - E||X - X'|| / 2 with great circle distances, the
+    multivariate generalisation of the CRPS (equal to it for one member).
+
+    Parameters
+    ----------
+        lat, lon : np.ndarray
+            member positions along axis, NaN where missing
+        obs_lat, obs_lon : np.ndarray
+            observed positions, shape of lat without axis
+        axis : int, optional
+            member axis
+
+    Returns
+    -------
+        es : np.ndarray
+            shape of obs_lat, NaN where the observation is missing or there
+            are no members
+    """
+    obs_lat = np.expand_dims(np.asarray(obs_lat, dtype=np.float64), axis)
+    obs_lon = np.expand_dims(np.asarray(obs_lon, dtype=np.float64), axis)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        dist = haversine(lat, lon, obs_lat, obs_lon)
+        m = np.isfinite(dist).sum(axis=axis)
+        skill = np.nansum(dist, axis=axis) / m
+    es = skill - 0.5 * mean_pairwise_distance(lat, lon, axis=axis)
+    es[np.isnan(np.take(obs_lat, 0, axis=axis)) | (m == 0)] = np.nan
+    return es
+
+
+def rank_histogram(ens, obs, axis=1, nbins=None, min_members=1, seed=None):
+    """ Rank of each observation among the ensemble members
+
+    Ties (common for integer pressures and winds) are broken at random.
+    Tracked members come and go, so points have different numbers of members.
+    The rank r among the m present members is spread uniformly over its
+    share of [0, 1], u = (r + U(0, 1)) / (m + 1), and binned into nbins
+    (the randomised PIT), which is uniform for a calibrated ensemble whatever
+    m is. With every member present it is the usual rank.
+
+    Parameters
+    ----------
+        ens : np.ndarray
+            ensemble values, members along axis, NaN where missing
+        obs : np.ndarray
+            observations, shape of ens without axis
+        axis : int, optional
+            member axis
+        nbins : int, optional
+            number of rank bins, defaults to the number of members + 1
+        min_members : int, optional
+            fewest present members for a point to be ranked
+        seed : int or np.random.Generator, optional
+            seed (or generator) for the tie breaking
+
+    Returns
+    -------
+        rank : np.ndarray (int)
+            shape of obs, 0..nbins-1, -1 where not ranked
+    """
+    x = np.moveaxis(np.asarray(ens, dtype=np.float64), axis, -1)
+    y = np.asarray(obs, dtype=np.float64)[..., None]
+    nbins = x.shape[-1] + 1 if nbins is None else nbins
+    rng = np.random.default_rng(seed)
+    m = np.isfinite(x).sum(axis=-1)
+    ties = (x == y).sum(axis=-1)
+    rank = (x < y).sum(axis=-1) + rng.integers(0, ties + 1)
+    pit = (rank + rng.random(rank.shape)) / (m + 1)
+    binned = np.minimum((pit * nbins).astype(np.int64), nbins - 1)
+    return np.where((m >= max(min_members, 1)) & np.isfinite(y[..., 0]), binned, -1)
+
+
+def rank_counts(rank, nbins, axis=0):
+    """ Histogram of ranks (from rank_histogram) along axis
+
+    Returns
+    -------
+        counts : np.ndarray (int)
+            shape of rank without axis, plus a last axis of nbins
+    """
+    rank = np.moveaxis(np.asarray(rank), axis, -1)
+    rows = np.arange(int(np.prod(rank.shape[:-1])))[:, None] * nbins
+    flat = (rows + rank.reshape(len(rows), -1))[rank.reshape(len(rows), -1) >= 0]
+    return np.bincount(flat, minlength=len(rows) * nbins).reshape(*rank.shape[:-1], nbins)
+
+
+def verifying_values(ens):
+    """ Best track interpolated to every (init, lead) valid time of an EnsembleTracks
+
+    Returns
+    -------
+        : dict
+            lat, lon, mslp, vmax -> (init, lead) arrays, NaN where the best
+            track cannot be interpolated (see track_error.interpolate_best_track)
+    """
+    bt = ens.best_track
+    valid = ens.valid_times.astype('datetime64[ns]')
+    ok, *cols = te.interpolate_best_track(valid.ravel(), bt.time, bt.lat, bt.lon, bt.mslp, bt.vmax, te.MAX_GAP)
+    values = {}
+    for var, col in zip(['lat', 'lon', 'mslp', 'vmax'], cols):
+        values[var] = np.full(valid.size, np.nan)
+        values[var][ok] = col
+        values[var] = values[var].reshape(valid.shape)
+    return values
+
+
+def point_scores(ens, members=None):
+    """ Energy score and intensity CRPS at every (init, lead) of an EnsembleTracks
+
+    Parameters
+    ----------
+        ens : EnsembleTracks
+        members : list of str, optional
+            members making up the ensemble, defaults to ensemble_tracks.ENS_ONLY
+
+    Returns
+    -------
+        : dict
+            energy_score, crps_mslp, crps_vmax -> (init, lead) arrays
+    """
+    obs = verifying_values(ens)
+    idx = ens.member_index(members)
+    scores = {'energy_score' : energy_score(ens.lat[:, idx], ens.lon[:, idx], obs['lat'], obs['lon'])}
+    for var in INTENSITY:
+        scores[f'crps_{var}'] = crps_ensemble(getattr(ens, var)[:, idx], obs[var])
+    return scores
+
+
+def lead_scores(ens, members=None):
+    """ Mean energy score and intensity CRPS at each lead over all inits
+
+    Parameters
+    ----------
+        ens : EnsembleTracks
+        members : list of str, optional
+            members making up the ensemble, defaults to ensemble_tracks.ENS_ONLY
+
+    Returns
+    -------
+        : pd.DataFrame
+            indexed by lead_hour, the mean of each point_scores score and the
+            number of (init) points it is taken over
+    """
+    scores = point_scores(ens, members)
+    frame = {}
+    for name, score in scores.items():
+        count = np.isfinite(score).sum(axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            frame[name] = np.nansum(score, axis=0) / count
+        frame[f'n_{name}'] = count
+    return pd.DataFrame(frame, index=pd.Index(ens.leads, name='lead_hour'))
+
+
+def intensity_rank_histograms(ens, members=None, nbins=None, min_members=1, seed=None):
+    """ Rank histograms of central pressure and maximum wind at each lead
+
+    Parameters
+    ----------
+        ens : EnsembleTracks
+        members : list of str, optional
+            members making up the ensemble, defaults to ensemble_tracks.ENS_ONLY
+        nbins : int, optional
+            number of rank bins, defaults to the number of members + 1
+        min_members : int, optional
+            fewest present members for a point to be ranked
+        seed : int, optional
+            seed for the tie breaking
+
+    Returns
+    -------
+        : dict
+            mslp, vmax -> (lead, nbins) counts over the inits
+    """
+    obs = verifying_values(ens)
+    idx = ens.member_index(members)
+    nbins = len(idx) + 1 if nbins is None else nbins
+    rng = np.random.default_rng(seed)
+    return {var : rank_counts(rank_histogram(getattr(ens, var)[:, idx], obs[var], nbins=nbins,
+                                             min_members=min_members, seed=rng), nbins)
+            for var in INTENSITY}
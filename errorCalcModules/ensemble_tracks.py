@@ -0,0 +1,452 @@
+"""
+CREATED: 17/10/2026
+
+Summary: Full ensemble ingestion of TIGGE track csvs.
+
+track_error keeps only the first of MEMBERS from each file. Here every member
+(ECMF control/high-res plus the EE00..EE50 perturbed members) of every file in
+a storm directory is kept, in dense (init, member, lead) arrays padded with NaN
+where a member has no fix. Each csv is parsed once and errors against the best
+track are computed for all members, leads and inits in a single pass.
+
+The arrays can be exported as an xarray Dataset with dimensions (init_time,
+member, lead_hour) and saved to NetCDF or Zarr. xarray is only imported when
+a Dataset is asked for.
+"""
+# Imports
+from dataclasses import dataclass
+import os
+import sys
+import warnings
+import numpy as np
+import pandas as pd
+import track_error as te
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'tcdata_python'))
+from TropCy import ensemble as tc_ensemble
+
+#############
+## GLOBALS ##
+#############
+
+# member axis, in this order, for the cxml2atcf csv output
+ENS_MEMBERS = ['ECMF'] + [f'EE{num:02d}' for num in range(51)]
+
+# the 51 member EPS alone. ECMF is the deterministic high-res run, not an
+# exchangeable member, so the ensemble scores leave it out by default
+ENS_ONLY = ENS_MEMBERS[1:]
+
+# lead axis (hours), cxml2atcf writes 0-144h every 6h
+LEADS = np.arange(0, 144+6, 6)
+
+FIELDS = ['lat', 'lon', 'mslp', 'vmax']
+ERRORS = ['track_error', 'intensity_error', 'along_track_error', 'cross_track_error']
+
+# default on-disk chunk length along init_time, members and leads are kept whole
+INIT_CHUNK = 16
+
+###############
+## FUNCTIONS ##
+###############
+
+def read_tracks_csv(dirpath):
+    """ Reads every csv in a storm directory into one DataFrame
+
+    Only the columns needed for the ensemble arrays are kept.
+
+    Parameters
+    ----------
+        dirpath : str
+            path to directory containing cyclone csvs
+
+    Returns
+    -------
+        df : pd.DataFrame
+            time (datetime64 init), model, forecastHr, lat, lon, mslp, vmax
+    """
+    frames = [pd.read_csv(os.path.join(dirpath, filename), skipinitialspace=True,
+                          usecols=['time', 'model', 'forecastHr'] + FIELDS)
+              for filename in sorted(os.listdir(dirpath)) if filename.endswith('.csv')]
+    df = pd.concat(frames, ignore_index=True)
+    df['time'] = pd.to_datetime(df['time'].astype(str), format='%Y%m%d%H')
+    return df
+
+
+def to_dense(df, members=ENS_MEMBERS, leads=LEADS):
+    """ Scatters long format track rows into dense (init, member, lead) arrays
+
+    Rows for members or leads not on the axes are dropped. If a fix appears
+    more than once the last one wins.
+
+    Parameters
+    ----------
+        df : pd.DataFrame
+            as returned by read_tracks_csv
+        members : list of str
+            member axis
+        leads : array_like of int
+            lead axis in hours
+
+    Returns
+    -------
+        inits : np.ndarray (datetime64[ns])
+            init time axis
+        fields : dict
+            lat, lon, mslp, vmax float arrays of shape (init, member, lead)
+    """
+    inits = np.unique(df['time'].values)
+    leads = np.asarray(leads)
+    m_idx = pd.Categorical(df['model'], categories=members).codes
+    l_idx = np.searchsorted(leads, df['forecastHr'].values)
+    l_idx = np.minimum(l_idx, len(leads)-1)
+    keep = (m_idx >= 0) & (leads[l_idx] == df['forecastHr'].values)
+    i_idx = np.searchsorted(inits, df['time'].values)[keep]
+    m_idx, l_idx = m_idx[keep], l_idx[keep]
+    fields = {}
+    for var in FIELDS:
+        arr = np.full((len(inits), len(members), len(leads)), np.nan)
+        arr[i_idx, m_idx, l_idx] = df[var].values[keep]
+        fields[var] = arr
+    return inits, fields
+
+
+def read_ensemble(dirpath, members=ENS_MEMBERS, leads=LEADS):
+    """ Builds an EnsembleTracks object for every member in a storm directory
+
+    Parameters
+    ----------
+        dirpath : str
+            path to directory containing cyclone csvs, following the
+            TropCy naming convention (e.g. tcTracksCleaned/Laura)
+        members : list of str, optional
+            member axis, defaults to ENS_MEMBERS
+        leads : array_like of int, optional
+            lead axis in hours, defaults to LEADS
+
+    Returns
+    -------
+        ens : EnsembleTracks
+    """
+    filenames = sorted(f for f in os.listdir(dirpath) if f.endswith('.csv'))
+    name, year = te.name_from_string(filenames[0])
+    inits, fields = to_dense(read_tracks_csv(dirpath), members, leads)
+    bt = te.best_track_arrays(os.path.join(dirpath, filenames[0]))
+    best_track = te.Track.from_arrays(bt['time'], np.round(bt['lat'].astype(np.float64), 1),
+                                      np.round(bt['lon'].astype(np.float64), 1), bt['mslp'], bt['vmax'])
+    return EnsembleTracks(name, int(year), inits, np.asarray(members), np.asarray(leads),
+                          fields['lat'], fields['lon'], fields['mslp'], fields['vmax'], best_track)
+
+
+def _import_xarray():
+    """ xarray is only needed for Dataset export, so it is imported on demand """
+    try:
+        import xarray as xr
+    except ImportError as err:
+        raise ImportError('xarray is required for Dataset export (pip install xarray)') from err
+    return xr
+
+
+def season_dataset(dirpath, members=ENS_MEMBERS, leads=LEADS):
+    """ Builds one Dataset for every storm directory in a season
+
+    Storm Datasets are concatenated along init_time, which carries a storm
+    coordinate saying which storm each init belongs to (init times are not
+    unique across the season when storms overlap). Storm directories that
+    cannot be read are skipped with a message, as generate_cyclone does.
+
+    Parameters
+    ----------
+        dirpath : str
+            path to directory of storm directories (e.g. tcTracksCleaned)
+        members : list of str, optional
+            member axis, defaults to ENS_MEMBERS
+        leads : array_like of int, optional
+            lead axis in hours, defaults to LEADS
+
+    Returns
+    -------
+        ds : xarray.Dataset
+            dims (init_time, member, lead_hour)
+    """
+    xr = _import_xarray()
+    datasets = []
+    for storm in sorted(os.listdir(dirpath)):
+        stormpath = os.path.join(dirpath, storm)
+        if not os.path.isdir(stormpath):
+            continue
+        try:
+            ds = read_ensemble(stormpath, members, leads).to_dataset()
+        except Exception as err:
+            print(f'skipping {storm}: {type(err).__name__}: {err}')
+            continue
+        ds = ds.assign_coords(storm=('init_time', np.full(ds.sizes['init_time'], storm)),
+                              year=('init_time', np.full(ds.sizes['init_time'], ds.attrs['year'])))
+        datasets.append(ds)
+    return xr.concat(datasets, dim='init_time', combine_attrs='drop')
+
+
+def save_dataset(ds, path, init_chunk=INIT_CHUNK):
+    """ Saves a track Dataset to NetCDF, or to Zarr if path ends in .zarr
+
+    Data is chunked along init_time only, so a season can be read back
+    lazily (xarray.open_dataset(path, chunks={})) one block of inits at a time.
+
+    Parameters
+    ----------
+        ds : xarray.Dataset
+            as returned by EnsembleTracks.to_dataset or season_dataset
+        path : str
+            output file (.nc) or store (.zarr)
+        init_chunk : int, optional
+            chunk length along init_time, defaults to INIT_CHUNK
+    """
+    chunks = (min(init_chunk, max(ds.sizes['init_time'], 1)), ds.sizes['member'], ds.sizes['lead_hour'])
+    if path.endswith('.zarr'):
+        ds.to_zarr(path, mode='w', encoding={var : {'chunks' : chunks} for var in FIELDS + ERRORS})
+    else:
+        ds.to_netcdf(path, encoding={var : {'zlib' : True, 'chunksizes' : chunks} for var in FIELDS + ERRORS})
+
+
+#############
+## CLASSES ##
+#############
+
+@dataclass
+class EnsembleTracks:
+    """ Dense ensemble forecast tracks and errors for a single TC
+
+    All forecast and error arrays have shape (init, member, lead) and are
+    NaN where a member has no fix or the fix has no best track to verify
+    against.
+
+    Attributes
+    ----------
+        name : str
+            NHC assigned storm name
+        year : int
+            Year of storm occurrence
+        inits : np.ndarray (datetime64[ns])
+            Forecast initialisation times
+        members : np.ndarray (str)
+            Ensemble member names (ECMF, EE00 ... EE50)
+        leads : np.ndarray (int)
+            Forecast lead times in hours
+        lat, lon, mslp, vmax : np.ndarray (float64)
+            Forecast TC centre, central pressure and maximum wind
+        best_track : Track
+            Best track the forecasts are verified against
+        track_error : np.ndarray (float32)
+            Great circle distance between forecast and best track (km)
+        intensity_error : np.ndarray (float32)
+            Forecast minus best track central pressure (mbar)
+        along_track_error, cross_track_error : np.ndarray (float32)
+            Track error split along/across the best track heading (km),
+            positive ahead of and to the right of the best track
+    """
+    name: str
+    year: int
+    inits: np.ndarray
+    members: np.ndarray
+    leads: np.ndarray
+    lat: np.ndarray
+    lon: np.ndarray
+    mslp: np.ndarray
+    vmax: np.ndarray
+    best_track: te.Track
+
+    def __post_init__(self):
+        self.track_error, self.intensity_error = self.compute_errors()
+        self.along_track_error, self.cross_track_error = self.along_cross_errors()
+
+    @property
+    def valid_times(self):
+        """ (init, lead) array of forecast valid times """
+        return self.inits[:, None] + self.leads[None, :].astype('timedelta64[h]')
+
+    def member_index(self, members=None):
+        """ Positions of members on the member axis
+
+        Parameters
+        ----------
+            members : list of str, optional
+                member names, defaults to those of ENS_ONLY present (every
+                member but the deterministic ECMF)
+
+        Returns
+        -------
+            : list of int
+        """
+        names = list(self.members)
+        if members is None:
+            return [idx for idx, name in enumerate(names) if name in ENS_ONLY]
+        return [names.index(member) for member in members]
+
+    def compute_errors(self):
+        """ Track and intensity errors for every init, member and lead at once
+
+        Returns
+        -------
+            track_error, intensity_error : np.ndarray
+                float32 arrays of shape (init, member, lead)
+        """
+        shape = self.lat.shape
+        valid = np.broadcast_to(self.valid_times[:, None, :], shape).ravel()
+        present = ~np.isnan(self.lat.ravel())
+        matched, t_err, i_err = te.match_errors(valid[present], self.lat.ravel()[present],
+                                                self.lon.ravel()[present], self.mslp.ravel()[present],
+                                                self.best_track.time, self.best_track.lat,
+                                                self.best_track.lon, self.best_track.mslp, max_gap=te.MAX_GAP)
+        flat_idx = np.flatnonzero(present)[matched]
+        track_error = np.full(shape, np.nan, dtype=np.float32)
+        intensity_error = np.full(shape, np.nan, dtype=np.float32)
+        track_error.ravel()[flat_idx] = t_err
+        intensity_error.ravel()[flat_idx] = i_err
+        return track_error, intensity_error
+
+    def along_cross_errors(self):
+        """ Along and cross track errors for every init, member and lead at once
+
+        The best track is interpolated to each valid time as in match_errors.
+        The heading is taken from the neighbouring best track points for times
+        on a best track entry, and from the bracketing entries in between.
+        TropCy.ensemble.along_across_error is then broadcast over the members.
+
+        Returns
+        -------
+            along_track_error, cross_track_error : np.ndarray
+                float32 arrays of shape (init, member, lead), NaN where
+                track_error is
+        """
+        bt = self.best_track
+        valid = self.valid_times.astype('datetime64[ns]')
+        ok, int_lats, int_lons, _, _, idx, frac = te.interpolate_best_track(
+            valid.ravel(), bt.time, bt.lat, bt.lon, bt.mslp, bt.vmax, te.MAX_GAP)
+        order = np.argsort(bt.time, kind='stable')
+        bt_lats = bt.lat.astype(np.float64)[order]
+        bt_lons = bt.lon.astype(np.float64)[order]
+        heading = tc_ensemble.track_heading(bt_lats, bt_lons)
+        nxt = np.minimum(idx + 1, len(bt_lats) - 1)
+        _, seg_heading = tc_ensemble.haversine_distance_angle(bt_lats[idx], bt_lons[idx], bt_lats[nxt], bt_lons[nxt])
+        ref = np.full((3, valid.size), np.nan)
+        ref[:, ok] = int_lats, int_lons, np.where(frac == 0, heading[idx], seg_heading)
+        ref_lat, ref_lon, ref_heading = (col.reshape(valid.shape)[:, None, :] for col in ref)
+        with np.errstate(invalid='ignore'):
+            along, cross = tc_ensemble.along_across_error(self.lat, self.lon, ref_lat, ref_lon, ref_heading)
+        unverified = np.isnan(self.track_error)
+        along[unverified] = np.nan
+        cross[unverified] = np.nan
+        return along.astype(np.float32), cross.astype(np.float32)
+
+    def ellipses(self, min_no=0):
+        """ Ensemble uncertainty ellipse for every init and lead at once
+
+        Parameters
+        ----------
+            min_no : int, optional
+                fewest members needed for an ellipse (at least 2)
+
+        Returns
+        -------
+            major, minor, angle, valid : np.ndarray
+                (init, lead) arrays from TropCy.ensemble.ensemble_ellipse,
+                NaN where valid is False
+        """
+        return tc_ensemble.ensemble_ellipse(self.lat, self.lon, axis=1, min_no=min_no)
+
+    def strike_verification(self, members=None, **kwargs):
+        """ Strike probabilities of the ensemble for every init and their Brier scores
+
+        Parameters
+        ----------
+            members : list of str, optional
+                members making up the ensemble, defaults to ENS_ONLY
+            **kwargs :
+                radius, res or extent for strike_probability.StrikeVerification
+
+        Returns
+        -------
+            : StrikeVerification
+        """
+        import strike_probability
+        idx = self.member_index(members)
+        return strike_probability.StrikeVerification(self.lat[:, idx], self.lon[:, idx], self.valid_times,
+                                                      self.best_track, **kwargs)
+
+    def scores(self, members=None):
+        """ Energy score and intensity CRPS of the ensemble at each lead
+
+        Parameters
+        ----------
+            members : list of str, optional
+                members making up the ensemble, defaults to ENS_ONLY
+
+        Returns
+        -------
+            : pd.DataFrame
+                see ensemble_scores.lead_scores
+        """
+        import ensemble_scores
+        return ensemble_scores.lead_scores(self, members)
+
+    def member_model(self, member='ECMF'):
+        """ Returns a single member as a track_error Model of one Track per init
+
+        Lets a member be used anywhere a Cyclone's ecmwf Model is. Only
+        verified points are kept, as extract_position_data does.
+
+        Parameters
+        ----------
+            member : str
+                member name, defaults to ECMF
+
+        Returns
+        -------
+            : Model
+        """
+        m_idx = list(self.members).index(member)
+        runs = []
+        for i_idx in range(len(self.inits)):
+            keep = ~np.isnan(self.track_error[i_idx, m_idx])
+            if not keep.any():
+                continue
+            runs.append(te.Track.from_arrays(self.valid_times[i_idx][keep],
+                                             *(getattr(self, var)[i_idx, m_idx][keep] for var in FIELDS),
+                                             self.track_error[i_idx, m_idx][keep],
+                                             self.intensity_error[i_idx, m_idx][keep]))
+        return te.Model(runs)
+
+    def lead_errors(self):
+        """ Mean track and intensity error at each lead over all inits and members
+
+        Returns
+        -------
+            : tuple of np.ndarray
+                mean track error and mean intensity error, each of length lead
+        """
+        with warnings.catch_warnings():
+            # leads with no verified member at all are left NaN
+            warnings.simplefilter('ignore', RuntimeWarning)
+            return (np.nanmean(self.track_error, axis=(0, 1)), np.nanmean(self.intensity_error, axis=(0, 1)))
+
+    def to_dataset(self):
+        """ Returns the forecast and error arrays as an xarray Dataset
+
+        Returns
+        -------
+            ds : xarray.Dataset
+                lat, lon, mslp, vmax and the ERRORS variables with dims
+                (init_time, member, lead_hour), NaN where there is no fix,
+                plus a valid_time (init_time, lead_hour) coordinate
+        """
+        xr = _import_xarray()
+        dims = ('init_time', 'member', 'lead_hour')
+        units = {'lat' : 'degrees_north', 'lon' : 'degrees_east', 'mslp' : 'hPa', 'vmax' : 'kt',
+                 'track_error' : 'km', 'intensity_error' : 'hPa', 'along_track_error' : 'km',
+                 'cross_track_error' : 'km'}
+        data_vars = {var : (dims, getattr(self, var), {'units' : units[var]}) for var in FIELDS + ERRORS}
+        coords = {
+            'init_time' : self.inits.astype('datetime64[ns]'),
+            'member' : self.members.astype(str),
+            'lead_hour' : self.leads,
+            'valid_time' : (('init_time', 'lead_hour'), self.valid_times.astype('datetime64[ns]')),
+        }
+        return xr.Dataset(data_vars, coords=coords, attrs={'name' : self.name, 'year' : self.year})
@@ -0,0 +1,333 @@
+"""
+CREATED: 17/10/2026
+
+Summary: Streaming, mergeable error statistics per lead hour, model and storm.
+
+Track and Model only give statistics once every Forecast of a storm is held in
+memory. The accumulators here keep just count, mean, sum of squared deviations
+(Welford/Chan), min and max for each lead hour, so files can be folded in one at
+a time as they are ingested and statistics read off at any point, in memory
+that does not grow with the number of forecasts. Accumulators from different
+workers (or different days) merge exactly, so a season can be split across a
+process pool and combined at the end.
+"""
+# Imports
+import multiprocessing
+import os
+import numpy as np
+import pandas as pd
+import track_error as te
+
+#############
+## GLOBALS ##
+#############
+
+ERRORS = ['track_error', 'intensity_error']
+
+# fields stored per lead hour by RunningStats
+STATS = ['count', 'mean', 'm2', 'min', 'max']
+
+###############
+## FUNCTIONS ##
+###############
+
+def lead_hours(times, filepath):
+    """ Lead hour of each valid time, taking the init time from the filename
+
+    Parameters
+    ----------
+        times : array_like of datetime64
+            valid times
+        filepath : str
+            csv following the TropCy naming convention (Name-YYYY-MM-DD-HH.csv)
+
+    Returns
+    -------
+        leads : np.ndarray (int)
+    """
+    init = pd.to_datetime('-'.join(os.path.basename(filepath)[:-4].split('-')[-4:]), format='%Y-%m-%d-%H')
+    return ((np.asarray(times, dtype='datetime64[ns]') - init.to_datetime64()) // np.timedelta64(1, 'h')).astype(int)
+
+
+def _file_worker(filepath):
+    """ Pool worker returning (ErrorStats for one file, error) """
+    try:
+        stats = ErrorStats()
+        stats.add_file(filepath)
+        return stats, None
+    except Exception as err:
+        return None, f'{type(err).__name__}: {err}'
+
+
+def season_stats(dirpath, processes=None):
+    """ ErrorStats for every csv of every storm in a season, built in a process pool
+
+    Each worker folds one file into its own ErrorStats and only those small
+    accumulators come back to be merged, no Cyclone or Track is kept.
+
+    Parameters
+    ----------
+        dirpath : str
+            path to directory of storm directories (e.g. tcTracksCleaned)
+        processes : int, optional
+            number of worker processes, defaults to the number of cpus
+
+    Returns
+    -------
+        stats : ErrorStats
+        failures : dict
+            filepath -> error for files that could not be read
+    """
+    files = [os.path.join(dirpath, storm, filename)
+             for storm in sorted(os.listdir(dirpath)) if os.path.isdir(os.path.join(dirpath, storm))
+             for filename in sorted(os.listdir(os.path.join(dirpath, storm)))]
+    stats = ErrorStats()
+    failures = {}
+    with multiprocessing.Pool(processes, initializer=te._init_worker,
+                              initargs=(te.HURDAT2_PATH, te.MEMBERS, te.MAX_GAP)) as pool:
+        for filepath, (result, error) in zip(files, pool.imap(_file_worker, files)):
+            if error is not None:
+                failures[filepath] = error
+                continue
+            stats.merge(result)
+    return stats, failures
+
+
+#############
+## CLASSES ##
+#############
+
+class RunningStats:
+    """ Welford accumulator of count, mean, variance, min and max per lead hour
+
+    Lead hours index the arrays directly, which grow as longer leads are seen.
+    Batches are folded in with one bincount per statistic and combined with
+    Chan's parallel update, so adding a batch or merging two accumulators gives
+    the same result (up to rounding) as one pass over all the data.
+
+    Attributes
+    ----------
+        count : np.ndarray (int)
+            Number of values at each lead hour
+        mean : np.ndarray
+            Running mean at each lead hour
+        m2 : np.ndarray
+            Sum of squared deviations from the mean at each lead hour
+        min, max : np.ndarray
+            Smallest and largest value at each lead hour
+    """
+    def __init__(self, nleads=0):
+        self.count = np.zeros(nleads, dtype=np.int64)
+        self.mean = np.zeros(nleads)
+        self.m2 = np.zeros(nleads)
+        self.min = np.full(nleads, np.inf)
+        self.max = np.full(nleads, -np.inf)
+
+    def _grow(self, nleads):
+        extra = nleads - len(self.count)
+        if extra > 0:
+            self.count = np.concatenate([self.count, np.zeros(extra, dtype=np.int64)])
+            self.mean = np.concatenate([self.mean, np.zeros(extra)])
+            self.m2 = np.concatenate([self.m2, np.zeros(extra)])
+            self.min = np.concatenate([self.min, np.full(extra, np.inf)])
+            self.max = np.concatenate([self.max, np.full(extra, -np.inf)])
+
+    def _combine(self, count, mean, m2, vmin, vmax):
+        """ Chan et al. combination of per lead (count, mean, m2, min, max) into self """
+        self._grow(len(count))
+        n = len(count)
+        n_a, n_b = self.count[:n], count
+        total = n_a + n_b
+        with np.errstate(invalid='ignore', divide='ignore'):
+            delta = mean - self.mean[:n]
+            frac = np.where(total > 0, n_b / total, 0)
+            self.mean[:n] += delta * frac
+            self.m2[:n] += m2 + delta**2 * n_a * frac
+        self.count[:n] = total
+        np.minimum(self.min[:n], vmin, out=self.min[:n])
+        np.maximum(self.max[:n], vmax, out=self.max[:n])
+
+    def update(self, leads, values):
+        """ Folds a batch of values into the accumulator
+
+        Parameters
+        ----------
+            leads : array_like of int
+                lead hour of each value (non-negative)
+            values : array_like
+                values to add, NaNs are skipped
+        """
+        leads = np.asarray(leads, dtype=np.int64).ravel()
+        values = np.asarray(values, dtype=np.float64).ravel()
+        keep = ~np.isnan(values) & (leads >= 0)
+        leads, values = leads[keep], values[keep]
+        if len(leads) == 0:
+            return
+        nleads = max(leads.max() + 1, len(self.count))
+        count = np.bincount(leads, minlength=nleads)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.bincount(leads, values, minlength=nleads) / count
+        mean[count == 0] = 0
+        m2 = np.bincount(leads, (values - mean[leads])**2, minlength=nleads)
+        vmin = np.full(nleads, np.inf)
+        vmax = np.full(nleads, -np.inf)
+        np.minimum.at(vmin, leads, values)
+        np.maximum.at(vmax, leads, values)
+        self._combine(count, mean, m2, vmin, vmax)
+
+    def merge(self, other):
+        """ Folds another RunningStats into this one, returns self """
+        self._combine(other.count, other.mean, other.m2, other.min, other.max)
+        return self
+
+    def __iadd__(self, other):
+        return self.merge(other)
+
+    def __add__(self, other):
+        return RunningStats().merge(self).merge(other)
+
+    @property
+    def variance(self):
+        """ Sample variance (ddof=1) at each lead, NaN with fewer than 2 values """
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(self.count > 1, self.m2 / (self.count - 1), np.nan)
+
+    @property
+    def std(self):
+        return np.sqrt(self.variance)
+
+    @property
+    def rmse(self):
+        """ Root mean square of the values at each lead (for errors, the RMSE) """
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(self.count > 0, np.sqrt(self.m2 / self.count + self.mean**2), np.nan)
+
+    def to_frame(self):
+        """ DataFrame indexed by lead hour, leads with no values left out """
+        leads = np.flatnonzero(self.count)
+        return pd.DataFrame({'count' : self.count[leads], 'mean' : self.mean[leads],
+                             'std' : self.std[leads], 'rmse' : self.rmse[leads],
+                             'min' : self.min[leads], 'max' : self.max[leads]},
+                            index=pd.Index(leads, name='lead_hour'))
+
+
+class ErrorStats:
+    """ RunningStats of each error per (storm, model), mergeable across workers
+
+    Attributes
+    ----------
+        stats : dict
+            (storm, model, error) -> RunningStats, error in ERRORS
+        files : set
+            absolute paths of csvs already folded in by add_file
+    """
+    def __init__(self):
+        self.stats = {}
+        self.files = set()
+
+    def _get(self, storm, model, error):
+        key = (storm, model, error)
+        if key not in self.stats:
+            self.stats[key] = RunningStats()
+        return self.stats[key]
+
+    def update(self, storm, model, leads, track_error, intensity_error):
+        """ Folds one batch of errors in
+
+        Parameters
+        ----------
+            storm, model : str
+            leads : array_like of int
+                lead hour of each error
+            track_error, intensity_error : array_like
+        """
+        self._get(storm, model, 'track_error').update(leads, track_error)
+        self._get(storm, model, 'intensity_error').update(leads, intensity_error)
+
+    def add_file(self, filepath):
+        """ Reads and verifies one csv (as read_position_data) and folds its errors in
+
+        Files already added are skipped so re-running ingestion over a
+        directory only counts the new files. Returns True if the file was added.
+        """
+        key = os.path.abspath(filepath)
+        if key in self.files:
+            return False
+        forecasts, model, _ = te.read_position_data(filepath)
+        name, _ = te.name_from_string(filepath)
+        self.update(name, model, lead_hours(forecasts.time, filepath),
+                    forecasts.track_error, forecasts.intensity_error)
+        self.files.add(key)
+        return True
+
+    def add_ensemble(self, ens):
+        """ Folds in every member of an EnsembleTracks, each member as its own model """
+        for m_idx, member in enumerate(ens.members):
+            self.update(ens.name, str(member), np.broadcast_to(ens.leads, ens.track_error[:, m_idx].shape),
+                        ens.track_error[:, m_idx], ens.intensity_error[:, m_idx])
+
+    def merge(self, other):
+        """ Folds another ErrorStats into this one, returns self """
+        for (storm, model, error), running in other.stats.items():
+            self._get(storm, model, error).merge(running)
+        self.files |= other.files
+        return self
+
+    def __iadd__(self, other):
+        return self.merge(other)
+
+    def total(self, error='track_error', storm=None, model=None):
+        """ RunningStats of one error merged over all matching storms and models
+
+        Parameters
+        ----------
+            error : str
+                one of ERRORS
+            storm, model : str or list of str, optional
+                restrict to these storms / models, default all
+
+        Returns
+        -------
+            : RunningStats
+        """
+        storms = [storm] if isinstance(storm, str) else storm
+        models = [model] if isinstance(model, str) else model
+        running = RunningStats()
+        for (key_storm, key_model, key_error), stats in self.stats.items():
+            if key_error == error and (storms is None or key_storm in storms) and (models is None or key_model in models):
+                running.merge(stats)
+        return running
+
+    def to_frame(self):
+        """ Long DataFrame of every (storm, model, error, lead_hour) statistic """
+        frames = []
+        for (storm, model, error), running in sorted(self.stats.items()):
+            frame = running.to_frame().reset_index()
+            frame.insert(0, 'error', error)
+            frame.insert(0, 'model', model)
+            frame.insert(0, 'storm', storm)
+            frames.append(frame)
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+    def save(self, filepath):
+        """ Writes the accumulators to a .npz so ingestion can resume later """
+        arrays = {'files' : np.array(sorted(self.files), dtype=str)}
+        for idx, ((storm, model, error), running) in enumerate(self.stats.items()):
+            arrays[f'key_{idx}'] = np.array([storm, model, error])
+            for stat in STATS:
+                arrays[f'{stat}_{idx}'] = getattr(running, stat)
+        np.savez(filepath, **arrays)
+
+    @classmethod
+    def load(cls, filepath):
+        """ Reads accumulators written by save """
+        stats = cls()
+        with np.load(filepath) as npz:
+            nkeys = sum(1 for name in npz.files if name.startswith('key_'))
+            for idx in range(nkeys):
+                running = RunningStats()
+                for stat in STATS:
+                    setattr(running, stat, npz[f'{stat}_{idx}'])
+                stats.stats[tuple(npz[f'key_{idx}'].tolist())] = running
+            stats.files = set(npz['files'].tolist())
+        return stats
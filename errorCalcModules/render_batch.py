@@ -0,0 +1,160 @@
+"""
+CREATED: 17/10/2026
+
+Summary: Parallel, headless rendering of every storm's verification maps.
+
+The per storm figures (forecast evolution and track/intensity error maps, e.g.
+deltaTE.png) used to be made by hand one Cyclone method call at a time, each
+redrawing cartopy's stock image and coastlines and adding one artist per run.
+render_season draws them for a whole season in a process pool on the Agg
+backend. Each worker:
+
+    * builds the Cyclone through the cyclone_cache,
+    * reuses a pre-rasterised basemap for the storm's (snapped) extent,
+    * draws each figure with one scatter collection for all runs,
+    * skips figures whose inputs have not changed since they were last drawn.
+
+Inputs are the cyclone_cache key (csvs, HURDAT2, MEMBERS, MAX_GAP) plus the
+figure settings. Its hash is kept next to each png in a .sha1 file.
+Only the workers import matplotlib.
+"""
+# Imports
+import hashlib
+import multiprocessing
+import os
+import tempfile
+import track_error as te
+import cyclone_cache
+
+#############
+## GLOBALS ##
+#############
+
+# bump when the figures change so everything is redrawn once
+RENDER_VERSION = 1
+
+# figure name suffix -> track_plots drawing function
+FIGURES = {'evolution' : 'draw_evolution_map', 'TE' : 'draw_error_maps'}
+
+###############
+## FUNCTIONS ##
+###############
+
+def _init_worker(hurdat2_path, members, max_gap):
+    """ Pool initialiser, forces the Agg backend before matplotlib is imported """
+    os.environ['MPLBACKEND'] = 'Agg'
+    te._init_worker(hurdat2_path, members, max_gap)
+
+
+def figure_hash(dirpath, kind, dpi):
+    """ Hash of everything a storm figure is drawn from """
+    return hashlib.sha1(f'{cyclone_cache.cache_key(dirpath)}:{kind}:{dpi}:v{RENDER_VERSION}'.encode()).hexdigest()
+
+
+def _up_to_date(pngpath, digest):
+    try:
+        with open(pngpath + '.sha1') as fid:
+            return os.path.isfile(pngpath) and fid.read().strip() == digest
+    except OSError:
+        return False
+
+
+def _replace(tmpname, path):
+    """ Renames a finished temporary file over path """
+    # mkstemp creates files 0600, give the usual permissions before the rename
+    umask = os.umask(0)
+    os.umask(umask)
+    os.chmod(tmpname, 0o666 & ~umask)
+    os.replace(tmpname, path)
+
+
+def _save(fig, pngpath, digest, dpi):
+    """ Saves a figure and its input hash, each written then renamed into place """
+    outdir = os.path.dirname(os.path.abspath(pngpath))
+    fd, tmpname = tempfile.mkstemp(dir=outdir, suffix='.png')
+    os.close(fd)
+    fig.savefig(tmpname, dpi=dpi)
+    _replace(tmpname, pngpath)
+    fd, tmpname = tempfile.mkstemp(dir=outdir, suffix='.sha1')
+    with os.fdopen(fd, 'w') as fid:
+        fid.write(digest)
+    _replace(tmpname, pngpath + '.sha1')
+
+
+def render_storm(dirpath, outdir, dpi=150, force=False):
+    """ Draws (or skips) the figures for one storm directory
+
+    Parameters
+    ----------
+        dirpath : str
+            path to directory containing cyclone csvs
+        outdir : str
+            directory for the pngs, named <storm>_<kind>.png
+        dpi : int, optional
+        force : bool, optional
+            redraw even if the inputs are unchanged
+
+    Returns
+    -------
+        status : dict
+            figure kind -> 'rendered' or 'skipped'
+    """
+    storm = os.path.basename(os.path.normpath(dirpath))
+    todo = {}
+    for kind in FIGURES:
+        pngpath = os.path.join(outdir, f'{storm}_{kind}.png')
+        digest = figure_hash(dirpath, kind, dpi)
+        if force or not _up_to_date(pngpath, digest):
+            todo[kind] = (pngpath, digest)
+    status = {kind : 'skipped' for kind in FIGURES if kind not in todo}
+    if not todo:
+        return status
+    import track_plots
+    cyclone = cyclone_cache.cached_cyclone(dirpath)
+    if cyclone is None:
+        raise ValueError(f'no Cyclone could be built from {dirpath}')
+    extent = track_plots.storm_extent(cyclone)
+    image = track_plots.basemap(extent)
+    for kind, (pngpath, digest) in todo.items():
+        fig = getattr(track_plots, FIGURES[kind])(cyclone, image, extent)
+        _save(fig, pngpath, digest, dpi)
+        track_plots.plt.close(fig)
+        status[kind] = 'rendered'
+    return status
+
+
+def _render_worker(args):
+    """ Pool worker returning (status, error) so one bad storm can't sink a season """
+    try:
+        return render_storm(*args), None
+    except Exception as err:
+        return None, f'{type(err).__name__}: {err}'
+
+
+def render_season(dirpath, outdir, processes=None, dpi=150, force=False):
+    """ Draws every storm's figures for a season across a process pool
+
+    Parameters
+    ----------
+        dirpath : str
+            path to directory of storm directories (e.g. tcTracksCleaned)
+        outdir : str
+            directory for the pngs (created if needed)
+        processes : int, optional
+            number of worker processes, defaults to the number of cpus
+        dpi : int, optional
+        force : bool, optional
+            redraw even if the inputs are unchanged
+
+    Returns
+    -------
+        results : dict
+            storm -> status dict from render_storm, or an error string
+    """
+    os.makedirs(outdir, exist_ok=True)
+    storms = sorted(storm for storm in os.listdir(dirpath) if os.path.isdir(os.path.join(dirpath, storm)))
+    tasks = [(os.path.join(dirpath, storm), outdir, dpi, force) for storm in storms]
+    with multiprocessing.Pool(processes, initializer=_init_worker,
+                              initargs=(te.HURDAT2_PATH, te.MEMBERS, te.MAX_GAP)) as pool:
+        results = pool.map(_render_worker, tasks)
+    return {storm : (status if error is None else error) for storm, (status, error) in zip(storms, results)}
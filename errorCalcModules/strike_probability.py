@@ -0,0 +1,377 @@
+"""
+CREATED: 17/10/2026
+
+Summary: Gridded strike probabilities and their Brier (skill) scores.
+
+The strike probability of a grid cell for one forecast initialisation is the
+fraction of ensemble members whose track passes within STRIKE_RADIUS km of the
+cell centre. Tracks are first densified along each lead step so a fast moving
+storm cannot skip over a cell between 6 hourly fixes. Each point is then binned
+to its grid cell and only the fixed window of neighbouring cells that can lie
+within the radius is checked, so the cost grows with the number of points and
+not with cells x points.
+
+The best track is turned into an occurrence grid the same way (interpolated to
+the forecast valid times, see track_error.interpolate_best_track) and the
+probabilities are scored against it with the Brier score. The Brier skill score
+is relative to the sample climatology (base rate) unless a reference
+probability is given.
+"""
+# Imports
+from dataclasses import dataclass, field
+import os
+import sys
+import numpy as np
+import track_error as te
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'tcdata_python'))
+from TropCy.geodesy import EARTH_RADIUS, haversine
+
+#############
+## GLOBALS ##
+#############
+
+# strike radius (km), 65 nmi as in the NHC strike probabilities
+STRIKE_RADIUS = 120.
+
+# grid spacing (degrees)
+GRID_RES = 0.5
+
+KM_PER_DEG = np.pi / 180 * EARTH_RADIUS
+
+# (point, neighbouring cell) pairs checked per block, bounds the memory used
+PAIR_CHUNK = 2**22
+
+###############
+## FUNCTIONS ##
+###############
+
+def densify(lat, lon, radius=STRIKE_RADIUS):
+    """ Inserts points along every lead step so fixes are at most radius/4 apart
+
+    Each step is split into as many substeps as its own length needs (at most
+    64), so a track's points do not depend on the other tracks passed with it.
+    Steps needing fewer substeps than the longest are padded with NaN to
+    keep the array dense. Positions are interpolated linearly in lat/lon,
+    which is close enough to the great circle over a 6 hour step for this
+    purpose.
+
+    Parameters
+    ----------
+        lat, lon : np.ndarray
+            (..., lead) tracks, NaN where there is no fix
+        radius : float, optional
+            strike radius (km)
+
+    Returns
+    -------
+        lat, lon : np.ndarray
+            (..., points) tracks, the original fixes plus the inserted points,
+            NaN padded
+    """
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    if lat.shape[-1] < 2:
+        return lat, lon
+    with np.errstate(invalid='ignore'):
+        step = haversine(lat[..., :-1], lon[..., :-1], lat[..., 1:], lon[..., 1:])
+    nsub = np.ones(step.shape, dtype=np.int64)
+    finite = np.isfinite(step)
+    nsub[finite] = np.clip(np.ceil(step[finite] / (radius / 4)), 1, 64)
+    width = int(nsub.max()) if nsub.size else 1
+    if width <= 1:
+        return lat, lon
+    sub = np.arange(width)
+    frac = np.where(sub < nsub[..., None], sub / nsub[..., None], np.nan)
+    def fill(x):
+        seg = x[..., :-1, None] + (x[..., 1:, None] - x[..., :-1, None]) * frac
+        # keep each fix even when the next one is missing
+        seg[..., 0] = x[..., :-1]
+        return np.concatenate([seg.reshape(*x.shape[:-1], -1), x[..., -1:]], axis=-1)
+    return fill(lat), fill(lon)
+
+
+def strike_grid(extent, res=GRID_RES):
+    """ Cell centre latitudes and longitudes of a regular grid
+
+    Parameters
+    ----------
+        extent : list
+            [lon0, lon1, lat0, lat1] in degrees
+        res : float, optional
+            grid spacing (degrees)
+
+    Returns
+    -------
+        grid_lat, grid_lon : np.ndarray
+    """
+    nlat = max(int(round((extent[3] - extent[2]) / res)), 1)
+    nlon = max(int(round((extent[1] - extent[0]) / res)), 1)
+    return extent[2] + (np.arange(nlat) + 0.5) * res, extent[0] + (np.arange(nlon) + 0.5) * res
+
+
+def grid_extent(lat, lon, radius=STRIKE_RADIUS, res=GRID_RES):
+    """ Extent covering every finite point plus the strike radius, snapped outwards to res """
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    finite = np.isfinite(lat) & np.isfinite(lon)
+    if not finite.any():
+        raise ValueError('no finite positions to grid')
+    pad_lat = radius / KM_PER_DEG + res
+    lat0, lat1 = lat[finite].min() - pad_lat, lat[finite].max() + pad_lat
+    pad_lon = pad_lat / np.cos(np.deg2rad(min(max(abs(lat0), abs(lat1)), 89.)))
+    lon0, lon1 = lon[finite].min() - pad_lon, lon[finite].max() + pad_lon
+    return [float(np.floor(lon0 / res) * res), float(np.ceil(lon1 / res) * res),
+            float(max(np.floor(lat0 / res) * res, -90)), float(min(np.ceil(lat1 / res) * res, 90))]
+
+
+def strike_mask(lat, lon, extent, res=GRID_RES, radius=STRIKE_RADIUS):
+    """ Whether each track passes within radius of each grid cell centre
+
+    Every (densified) point is binned to its cell and checked against the
+    fixed window of cells within radius of it, in blocks of PAIR_CHUNK pairs.
+
+    Parameters
+    ----------
+        lat, lon : np.ndarray
+            (..., lead) tracks, one track per leading index, NaN where there
+            is no fix
+        extent : list
+            [lon0, lon1, lat0, lat1] of the grid (see strike_grid)
+        res : float, optional
+            grid spacing (degrees)
+        radius : float, optional
+            strike radius (km)
+
+    Returns
+    -------
+        hit : np.ndarray (bool)
+            (..., nlat, nlon)
+    """
+    grid_lat, grid_lon = strike_grid(extent, res)
+    nlat, nlon = len(grid_lat), len(grid_lon)
+    lat, lon = densify(lat, lon, radius)
+    track_shape, npoints = lat.shape[:-1], lat.shape[-1]
+    hit = np.zeros((int(np.prod(track_shape)), nlat * nlon), dtype=bool)
+    present = np.flatnonzero(np.isfinite(lat.ravel()) & np.isfinite(lon.ravel()))
+    if present.size:
+        track = present // npoints
+        plat, plon = lat.ravel()[present], lon.ravel()[present]
+        row = np.floor((plat - extent[2]) / res).astype(np.int64)
+        col = np.floor((plon - extent[0]) / res).astype(np.int64)
+        # window of cells that can be within radius, widest at the most poleward point
+        drow = int(np.ceil(radius / (KM_PER_DEG * res))) + 1
+        coslat = np.cos(np.deg2rad(min(np.abs(plat).max() + drow * res, 89.)))
+        dcol = int(np.ceil(radius / (KM_PER_DEG * res * coslat))) + 1
+        orow, ocol = (off.ravel() for off in np.meshgrid(np.arange(-drow, drow + 1),
+                                                         np.arange(-dcol, dcol + 1), indexing='ij'))
+        chunk = max(PAIR_CHUNK // len(orow), 1)
+        for start in range(0, len(plat), chunk):
+            block = slice(start, start + chunk)
+            rows = row[block, None] + orow
+            cols = col[block, None] + ocol
+            inside = (rows >= 0) & (rows < nlat) & (cols >= 0) & (cols < nlon)
+            np.clip(rows, 0, nlat - 1, out=rows)
+            np.clip(cols, 0, nlon - 1, out=cols)
+            dist = haversine(plat[block, None], plon[block, None], grid_lat[rows], grid_lon[cols])
+            near = inside & (dist <= radius)
+            hit[np.broadcast_to(track[block, None], near.shape)[near], (rows * nlon + cols)[near]] = True
+    return hit.reshape(*track_shape, nlat, nlon)
+
+
+def strike_probability(lat, lon, extent, res=GRID_RES, radius=STRIKE_RADIUS):
+    """ Fraction of members passing within radius of each cell, for every init
+
+    Parameters
+    ----------
+        lat, lon : np.ndarray
+            (init, member, lead) forecast tracks, NaN where there is no fix
+        extent : list
+            [lon0, lon1, lat0, lat1] of the grid
+        res : float, optional
+            grid spacing (degrees)
+        radius : float, optional
+            strike radius (km)
+
+    Returns
+    -------
+        prob : np.ndarray (float32)
+            (init, nlat, nlon), members with no fix at all for an init are not
+            counted, NaN for inits with no members
+    """
+    hits = strike_mask(lat, lon, extent, res, radius).sum(axis=1)
+    members = np.isfinite(lat).any(axis=-1).sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (hits / members[:, None, None]).astype(np.float32)
+
+
+def observed_strikes(valid_times, bt_times, bt_lats, bt_lons, extent, res=GRID_RES,
+                     radius=STRIKE_RADIUS, max_gap=None):
+    """ Whether the best track passed within radius of each cell, for every init
+
+    Parameters
+    ----------
+        valid_times : np.ndarray (datetime64)
+            (init, lead) times the best track is verified over, NaT to leave out
+        bt_times, bt_lats, bt_lons : array_like
+            best track
+        extent : list
+            [lon0, lon1, lat0, lat1] of the grid
+        res : float, optional
+            grid spacing (degrees)
+        radius : float, optional
+            strike radius (km)
+        max_gap : np.timedelta64, optional
+            widest best track gap to interpolate across, defaults to
+            track_error.MAX_GAP at call time
+
+    Returns
+    -------
+        obs : np.ndarray (bool)
+            (init, nlat, nlon)
+    """
+    max_gap = te.MAX_GAP if max_gap is None else max_gap
+    times = np.asarray(valid_times, dtype='datetime64[ns]')
+    lats = np.full(times.shape, np.nan)
+    lons = np.full(times.shape, np.nan)
+    known = ~np.isnat(times)
+    nan = np.full(len(bt_lats), np.nan)
+    valid, int_lats, int_lons, *_ = te.interpolate_best_track(times[known], bt_times, bt_lats, bt_lons,
+                                                              nan, nan, max_gap)
+    where = np.flatnonzero(known.ravel())[valid]
+    lats.ravel()[where] = int_lats
+    lons.ravel()[where] = int_lons
+    return strike_mask(lats, lons, extent, res, radius)
+
+
+def brier_score(prob, obs, mask=None):
+    """ Mean squared difference of forecast probabilities and 0/1 outcomes
+
+    Parameters
+    ----------
+        prob : np.ndarray
+            forecast probabilities, NaNs are left out
+        obs : np.ndarray (bool)
+            outcomes, same shape as prob
+        mask : np.ndarray (bool), optional
+            only score where True (broadcast against prob)
+
+    Returns
+    -------
+        : float
+    """
+    keep = np.isfinite(prob)
+    if mask is not None:
+        keep &= mask
+    if not keep.any():
+        return np.nan
+    return float(np.mean((prob[keep] - obs[keep])**2))
+
+
+def brier_skill_score(prob, obs, reference=None, mask=None):
+    """ Brier skill score, 1 - BS / BS_ref
+
+    Parameters
+    ----------
+        prob, obs, mask : np.ndarray
+            as brier_score
+        reference : float or np.ndarray, optional
+            reference probabilities (e.g. a per cell climatology) broadcast
+            against prob, defaults to the sample base rate of obs
+
+    Returns
+    -------
+        bss, bs, bs_ref : float
+    """
+    keep = np.isfinite(prob)
+    if mask is not None:
+        keep = keep & mask
+    if reference is None:
+        reference = obs[keep].mean() if keep.any() else np.nan
+    reference = np.broadcast_to(reference, np.shape(prob)).astype(np.float64)
+    bs = brier_score(prob, obs, keep)
+    bs_ref = brier_score(reference, obs, keep)
+    bss = 1 - bs / bs_ref if bs_ref > 0 else np.nan
+    return bss, bs, bs_ref
+
+
+#############
+## CLASSES ##
+#############
+
+@dataclass
+class StrikeVerification:
+    """ Strike probabilities of a set of forecasts and their Brier scores
+
+    For each init the best track is verified over the valid times at which at
+    least one member has a fix. Scores are taken over the active cells, those
+    with a non-zero probability or a best track strike for any init, so the
+    size of the grid does not change them.
+
+    Attributes
+    ----------
+        lat, lon : np.ndarray
+            (init, member, lead) forecast tracks, NaN where there is no fix
+        valid_times : np.ndarray (datetime64)
+            (init, lead) forecast valid times
+        best_track : Track
+            best track the forecasts are verified against
+        radius : float
+            strike radius (km)
+        res : float
+            grid spacing (degrees)
+        extent : list
+            [lon0, lon1, lat0, lat1] of the grid, defaults to the forecasts
+            and best track plus the radius
+        grid_lat, grid_lon : np.ndarray
+            grid cell centres
+        prob : np.ndarray (float32)
+            (init, nlat, nlon) strike probabilities
+        obs : np.ndarray (bool)
+            (init, nlat, nlon) best track strikes
+        active : np.ndarray (bool)
+            (nlat, nlon) cells scored
+        brier_score, reference_score, brier_skill_score : float
+            Brier score, Brier score of the sample climatology and skill score
+    """
+    lat: np.ndarray
+    lon: np.ndarray
+    valid_times: np.ndarray
+    best_track: te.Track
+    radius: float = STRIKE_RADIUS
+    res: float = GRID_RES
+    extent: list = None
+    grid_lat: np.ndarray = field(init=False)
+    grid_lon: np.ndarray = field(init=False)
+    prob: np.ndarray = field(init=False)
+    obs: np.ndarray = field(init=False)
+    active: np.ndarray = field(init=False)
+    brier_score: float = field(init=False)
+    reference_score: float = field(init=False)
+    brier_skill_score: float = field(init=False)
+
+    def __post_init__(self):
+        bt = self.best_track
+        if self.extent is None:
+            self.extent = grid_extent(np.concatenate([np.ravel(self.lat), bt.lat]),
+                                      np.concatenate([np.ravel(self.lon), bt.lon]), self.radius, self.res)
+        self.grid_lat, self.grid_lon = strike_grid(self.extent, self.res)
+        self.prob = strike_probability(self.lat, self.lon, self.extent, self.res, self.radius)
+        window = np.isfinite(self.lat).any(axis=1)
+        times = np.where(window, np.asarray(self.valid_times, dtype='datetime64[ns]'), np.datetime64('NaT'))
+        self.obs = observed_strikes(times, bt.time, bt.lat, bt.lon, self.extent, self.res, self.radius)
+        self.active = (self.prob > 0).any(axis=0) | self.obs.any(axis=0)
+        self.brier_skill_score, self.brier_score, self.reference_score = brier_skill_score(
+            self.prob, self.obs, mask=self.active[None])
+
+    @classmethod
+    def from_model(cls, model, best_track, **kwargs):
+        """ Verifies a track_error Model (one Track per init, a single member) """
+        nlead = max(len(run) for run in model.runs)
+        lat = np.full((len(model.runs), 1, nlead), np.nan)
+        lon = np.full((len(model.runs), 1, nlead), np.nan)
+        times = np.full((len(model.runs), nlead), np.datetime64('NaT'), dtype='datetime64[ns]')
+        for idx, run in enumerate(model.runs):
+            lat[idx, 0, :len(run)] = run.lat
+            lon[idx, 0, :len(run)] = run.lon
+            times[idx, :len(run)] = run.time
+        return cls(lat, lon, times, best_track, **kwargs)
@@ -20,17 +20,18 @@ Jupyter notebook tutorial on how to access attributes of a cyclone
 # Imports
 from dataclasses import dataclass, field
 import datetime as dt
+from functools import cached_property
+from itertools import groupby
 import os # if i cba to fix the directory structures dependencies lol
+import multiprocessing
+import sys
 from typing import List
-from math import asin, cos, radians, sin, sqrt
 import numpy as np
 import pandas as pd
-import hurdat2parser
-import cartopy.crs as ccrs
-import matplotlib.pyplot as plt
-import matplotlib as mpl
+import best_track as hurdat
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'tcdata_python'))
+from TropCy.geodesy import haversine
 import traceback
-from matplotlib.cm import get_cmap
     
 
 #############
@@ -40,8 +41,12 @@ from matplotlib.cm import get_cmap
 # fill out with the models you intend to use
 MEMBERS = ['ECMF','GEFS']
 
-# path to hurdat2 file
-ATL = hurdat2parser.Hurdat2('/Users/laratobias-tarsh/Documents/clim323-final/errorCalcModules/HURDAT2.txt')
+# path to hurdat2 file, parsed lazily and cached on first use (see best_track.py)
+HURDAT2_PATH = hurdat.HURDAT2_PATH
+
+# longest best track gap to interpolate across when verifying off-synoptic
+# valid times, None to only verify times with an exact best track entry
+MAX_GAP = np.timedelta64(6, 'h')
 
 ###############
 ## FUNCTIONS ##
@@ -113,13 +118,11 @@ def name_from_string(filepath):
 def parse_hurdat(filepath):
     """ Default constructor for HURDAT2 best track data
     
-    Uses the HURDAT2 parser python module to generate a best track for 
-    a TC object from the HURDAT2 database. This requires you to have the 
-    HURDAT2.txt file in your directory and the HURDAT2 parser installed.
-    If you run the yaml file install (see README), then it should install
-    via pip, although it isn't included. If not run:
-
-    pip install hurdat2parser in your laptop's command line
+    Uses the cached best track store (best_track.py) to generate a best track
+    for a TC object from the HURDAT2 database. This requires you to have the
+    HURDAT2.txt file in this directory, or its path in the HURDAT2 environment
+    variable. The first call parses HURDAT2 into an on-disk cache, every
+    later call (in any process) memory maps it.
 
     Parameters
     ----------
@@ -134,15 +137,39 @@ def parse_hurdat(filepath):
             Track object containing best track data
 
     """
-    # Generate tupled coord list: ATL[str(year)][str(name)].gps
+    storm = best_track_arrays(filepath)
+    times = storm['time'].astype('datetime64[us]').astype(object)
+    # HURDAT2 positions are given to 0.1 degrees, undo the float32 storage noise
+    lats = np.round(storm['lat'].astype(float), 1)
+    lons = np.round(storm['lon'].astype(float), 1)
+    best_track = [Position(time,lat,lon,float(mslp),float(vmax)) for (time,lat,lon,mslp,vmax) in 
+                  zip(times,lats.tolist(),lons.tolist(),storm['mslp'],storm['vmax'])]
+    return best_track
+
+
+def best_track_arrays(filepath):
+    """ Columnar HURDAT2 best track for the TC in filepath
+
+    Same lookup as parse_hurdat but returns the memory mapped arrays
+    from the best track store instead of a list of Positions.
+
+    Parameters
+    ----------
+        filepath : str
+            path to csv file following the TropCy naming convention
+
+    Returns
+    --------
+        storm : dict
+            time, lat, lon, mslp and vmax arrays
+    """
     name, year = name_from_string(filepath)
-    storm = ATL[year][name]
+    store = hurdat.get_store(HURDAT2_PATH)
     if name in ["Alpha"  , "Beta" , "Gamma" , "Delta" , "Epsilon" , "Zeta" , "Eta", "Theta" , "Iota" ]:
-        storm = ATL[check_greek_alphabet(name)]
+        return store[check_greek_alphabet(name)]
     if name == "Teddy":
-        storm = ATL["AL202020"]
-    best_track = [Position(entry.entrytime,entry.lat,entry.lon,entry.mslp,entry.wind) for entry in storm]
-    return best_track
+        return store["AL202020"]
+    return store[store.lookup(name, year)]
     
 def get_errors(best_track,forecast_pos):
     """ Calculates track errors for a TC
@@ -171,6 +198,139 @@ def get_errors(best_track,forecast_pos):
 
         
 
+def great_circle_array(lat1, lon1, lat2, lon2):
+    """ Vectorised haversine great circle distance
+
+    Same maths as Position.great_circle but for whole arrays at once, both go
+    through the shared TropCy.geodesy.haversine kernel.
+
+    Parameters
+    -----------
+    lat1, lon1, lat2, lon2 : array_like
+        coordinates in degrees, broadcast against each other
+
+    Returns
+    --------
+    gcd : np.ndarray
+        Great circle distance in km
+    """
+    return haversine(lat1, lon1, lat2, lon2)
+
+
+def interpolate_best_track(times, bt_times, bt_lats, bt_lons, bt_mslp, bt_vmax, max_gap=MAX_GAP):
+    """ Interpolates the best track to arbitrary valid times in one array operation
+
+    Position is interpolated along the great circle between the best track
+    entries either side of each time, central pressure and maximum wind
+    linearly. Times that fall exactly on a best track entry take that entry
+    (the last one if the time is repeated, as in match_errors).
+
+    Parameters
+    -----------
+    times : array_like of datetime64
+        times to interpolate to
+    bt_times : array_like of datetime64
+        best track times
+    bt_lats, bt_lons, bt_mslp, bt_vmax : array_like
+        best track positions, central pressure and maximum wind
+    max_gap : np.timedelta64 or None
+        widest gap between best track entries to interpolate across, times in
+        a wider gap (or outside the best track) are not valid. None only
+        allows exact matches
+
+    Returns
+    --------
+    valid : np.ndarray
+        boolean mask of times the best track could be interpolated to
+    lats, lons, mslp, vmax : np.ndarray
+        interpolated values for the valid times
+    idx, frac : np.ndarray
+        for the valid times, position in the time sorted best track of the
+        entry at or before each time and the fraction of the way to the next
+    """
+    times = np.asarray(times, dtype='datetime64[ns]')
+    bt_times = np.asarray(bt_times, dtype='datetime64[ns]')
+    order = np.argsort(bt_times, kind='stable')
+    sorted_times = bt_times[order]
+    lats, lons, mslp, vmax = (np.asarray(col, dtype=np.float64)[order]
+                              for col in (bt_lats, bt_lons, bt_mslp, bt_vmax))
+    idx = np.searchsorted(sorted_times, times, side='right') - 1
+    valid = idx >= 0
+    exact = valid.copy()
+    exact[valid] = sorted_times[idx[valid]] == times[valid]
+    if max_gap is not None and len(sorted_times) > 1:
+        between = valid & ~exact & (idx < len(sorted_times) - 1)
+        gap = sorted_times[np.minimum(idx + 1, len(sorted_times) - 1)] - sorted_times[np.maximum(idx, 0)]
+        between &= gap <= np.timedelta64(max_gap, 'ns')
+        valid = exact | between
+    else:
+        valid = exact
+    idx = idx[valid]
+    nxt = np.where(exact[valid], idx, idx + 1)
+    span = (sorted_times[nxt] - sorted_times[idx]).astype(np.float64)
+    frac = np.divide((times[valid] - sorted_times[idx]).astype(np.float64), span,
+                     out=np.zeros(len(idx)), where=span > 0)
+
+    # great circle (slerp) interpolation of position on the unit sphere
+    phi, lam = np.radians(lats), np.radians(lons)
+    xyz = np.stack([np.cos(phi) * np.cos(lam), np.cos(phi) * np.sin(lam), np.sin(phi)], axis=-1)
+    omega = haversine(lats[idx], lons[idx], lats[nxt], lons[nxt]) / 6371.
+    with np.errstate(invalid='ignore', divide='ignore'):
+        sin_omega = np.sin(omega)
+        w0 = np.where(omega > 1e-12, np.sin((1 - frac) * omega) / sin_omega, 1 - frac)
+        w1 = np.where(omega > 1e-12, np.sin(frac * omega) / sin_omega, frac)
+    point = w0[:, None] * xyz[idx] + w1[:, None] * xyz[nxt]
+    int_lats = np.degrees(np.arctan2(point[:, 2], np.hypot(point[:, 0], point[:, 1])))
+    int_lons = np.degrees(np.arctan2(point[:, 1], point[:, 0]))
+    # exact times keep the best track values untouched
+    on_entry = frac == 0
+    int_lats = np.where(on_entry, lats[idx], int_lats)
+    int_lons = np.where(on_entry, lons[idx], int_lons)
+    int_mslp = mslp[idx] + frac * (mslp[nxt] - mslp[idx])
+    int_vmax = vmax[idx] + frac * (vmax[nxt] - vmax[idx])
+    return valid, int_lats, int_lons, int_mslp, int_vmax, idx, frac
+
+
+def match_errors(fcst_times, fcst_lats, fcst_lons, fcst_mslp, bt_times, bt_lats, bt_lons, bt_mslp,
+                 max_gap=None):
+    """ Calculates track and intensity errors for all forecast positions in one pass
+
+    Replaces calling get_errors for each position. The best track is sorted on
+    valid time once and every forecast time is joined to it with a single
+    searchsorted, then errors are computed for all matched rows at once.
+    By default forecast positions with no best track entry at the same valid
+    time are not matched. With max_gap they are verified against the best
+    track interpolated to the valid time (see interpolate_best_track).
+
+    Parameters
+    -----------
+    fcst_times : array_like of datetime64
+        valid times of forecast positions
+    fcst_lats, fcst_lons, fcst_mslp : array_like
+        forecast positions and central pressure
+    bt_times : array_like of datetime64
+        best track times
+    bt_lats, bt_lons, bt_mslp : array_like
+        best track positions and central pressure
+    max_gap : np.timedelta64, optional
+        widest best track gap to interpolate across
+
+    Returns
+    --------
+    matched : np.ndarray
+        boolean mask of forecast positions with a best track match
+    t_error : np.ndarray
+        Great circle distance (km) for matched positions
+    i_error : np.ndarray
+        Forecast minus best track central pressure for matched positions
+    """
+    matched, bt_lats, bt_lons, bt_mslp, _, _, _ = interpolate_best_track(
+        fcst_times, bt_times, bt_lats, bt_lons, bt_mslp, np.zeros(len(bt_times)), max_gap)
+    t_error = great_circle_array(np.asarray(fcst_lats)[matched], np.asarray(fcst_lons)[matched], bt_lats, bt_lons)
+    i_error = np.asarray(fcst_mslp)[matched] - bt_mslp
+    return matched, t_error, i_error
+
+
 def extract_position_data(filepath):
     """ Helper for position function
 
@@ -186,39 +346,56 @@ def extract_position_data(filepath):
     
     Returns
     -------
-        forecasts : Forecast
-            Forecast object containing all assesment metrics for a TC
+        forecasts : Track
+            Track of Forecasts containing all assesment metrics for a TC
         model : string
             Name of model being used
-    
-    Note that these variables are stored in a list
+        best_track : Track
+            Track containing best track data
     """
     # read in file, convert datetime, extract ensemble
     try :
-        df = pd.read_csv(filepath,skipinitialspace=True)
-        ens = df.loc[df.model.isin(MEMBERS)]
-        model = ens.model.values[0]
-        # Parse filename and use HURDAT2 to get best track
-        best_track = parse_hurdat(filepath)
-            # iterate through forecast hours and extract variables and waste memory
-        positions = [Position((pd.to_datetime(ens.time.values[ix],format='%Y%m%d%H')+pd.DateOffset(hours=int(ens.forecastHr.values[ix]))),
-                                ens.lat.values[ix],ens.lon.values[ix],ens.mslp.values[ix],ens.vmax.values[ix]) for (ix,en) in enumerate(ens.time)]
-        # Discard times not in best track for sake of simplicity
-        bt = Track(best_track)
-        positions = [pos for pos in positions if pos.time in bt.return_times()]
-        
-        forecasts = []
-            # Iterate through positions and create forecast objects
-        for pos in positions:
-            t_e,i_e = get_errors(best_track,pos)
-            forecasts.append(Forecast(pos.time,pos.lat,pos.lon,pos.mslp,pos.vmax,t_e,i_e))
-
-            # return list of Forecasts
-        return forecasts,model, Track(best_track)
+        return read_position_data(filepath)
     except:
         pass
 
 
+def read_position_data(filepath):
+    """ Same as extract_position_data but raises on failure instead of returning None
+
+    Parameters
+    ----------
+        filepath : str
+            path to csv file
+
+    Returns
+    -------
+        forecasts, model, best_track
+            see extract_position_data
+    """
+    df = pd.read_csv(filepath,skipinitialspace=True)
+    ens = df.loc[df.model.isin(MEMBERS)]
+    if len(ens) == 0:
+        raise ValueError(f'no {MEMBERS} forecasts in {filepath}')
+    model = ens.model.values[0]
+    # Parse filename and use HURDAT2 to get best track
+    bt = best_track_arrays(filepath)
+    # HURDAT2 positions are given to 0.1 degrees, undo the float32 storage noise
+    bt_lats = np.round(bt['lat'].astype(np.float64), 1)
+    bt_lons = np.round(bt['lon'].astype(np.float64), 1)
+    best_track = Track.from_arrays(bt['time'], bt_lats, bt_lons, bt['mslp'], bt['vmax'])
+    # valid time = init + forecast hour, done once for the whole column
+    valid_times = (pd.to_datetime(ens.time.astype(str),format='%Y%m%d%H')
+                   + pd.to_timedelta(ens.forecastHr, unit='h')).values
+    # Join on valid time and compute errors for every position at once, times
+    # between best track entries are verified against the interpolated best track
+    matched, t_e, i_e = match_errors(valid_times, ens.lat.values, ens.lon.values, ens.mslp.values,
+                                     bt['time'], bt_lats, bt_lons, bt['mslp'], max_gap=MAX_GAP)
+    forecasts = Track.from_arrays(valid_times[matched], ens.lat.values[matched],
+                                  ens.lon.values[matched], ens.mslp.values[matched], ens.vmax.values[matched], t_e, i_e)
+    return forecasts, model, best_track
+
+
 def generate_cyclone(dirpath):
     """ Function initialises a cyclone object from a list of csvs
 
@@ -249,7 +426,7 @@ def generate_cyclone(dirpath):
             fcasts, model, best_track = extract_position_data(dirpath+"/"+filename)
         except:
             break
-        tracks = Track(fcasts)
+        tracks = fcasts
         if model == "ECMF":
             ecmf.append(tracks)
         #if model == "GFS":
@@ -260,18 +437,85 @@ def generate_cyclone(dirpath):
         pass
 
 
+def _init_worker(hurdat2_path, members, max_gap):
+    """ Pool initialiser, carries over settings changed at runtime (e.g. in a notebook) """
+    global HURDAT2_PATH, MEMBERS, MAX_GAP
+    HURDAT2_PATH = hurdat2_path
+    MEMBERS = members
+    MAX_GAP = max_gap
+
+
+def _read_worker(filepath):
+    """ Pool worker returning (result, error) so one bad file can't sink a season """
+    try:
+        return read_position_data(filepath), None
+    except Exception as err:
+        return None, f'{type(err).__name__}: {err}'
+
+
+def generate_season(dirpath, processes=None):
+    """ Initialises Cyclone objects for every storm directory in a season
+
+    Every csv file of every storm is read in a process pool, then each storm
+    is assembled in sorted file order so results do not depend on which worker
+    finished first. Unlike generate_cyclone a file that cannot be read does not
+    stop the rest of its storm being read, it is reported in failures instead.
+
+    Parameters
+    ----------
+        dirpath : str
+            path to directory of storm directories (e.g. tcTracksCleaned)
+        processes : int, optional
+            number of worker processes, defaults to the number of cpus
+
+    Returns
+    -------
+        cyclones : dict
+            storm directory name -> Cyclone, in sorted order
+        failures : dict
+            storm directory name -> list of (filename, error) for files or
+            storms that could not be read
+    """
+    storms = sorted(storm for storm in os.listdir(dirpath) if os.path.isdir(os.path.join(dirpath, storm)))
+    tasks = [(storm, filename) for storm in storms for filename in sorted(os.listdir(os.path.join(dirpath, storm)))]
+    with multiprocessing.Pool(processes, initializer=_init_worker, initargs=(HURDAT2_PATH, MEMBERS, MAX_GAP)) as pool:
+        results = pool.map(_read_worker, [os.path.join(dirpath, storm, filename) for (storm, filename) in tasks])
+
+    cyclones = {}
+    failures = {}
+    # tasks are in storm order so each storm's files are contiguous
+    for storm, storm_results in groupby(zip(tasks, results), key=lambda task: task[0][0]):
+        ecmf = []
+        best_track = None
+        for (_, filename), (result, error) in storm_results:
+            if error is not None:
+                failures.setdefault(storm, []).append((filename, error))
+                continue
+            fcasts, model, best_track = result
+            name, year = name_from_string(filename)
+            if model == "ECMF":
+                ecmf.append(fcasts)
+        if best_track is None:
+            failures.setdefault(storm, []).append((None, 'no readable files'))
+            continue
+        try:
+            cyclones[storm] = Cyclone(name, int(year), Model(ecmf), best_track)
+        except Exception as err:
+            failures.setdefault(storm, []).append((None, f'{type(err).__name__}: {err}'))
+    return cyclones, failures
+
+
 def colorFader(c1,c2,mix=0):
-    """ Fades two matplotlib colors together into a gradient """
-    c1=np.array(mpl.colors.to_rgb(c1))
-    c2=np.array(mpl.colors.to_rgb(c2))
-    return mpl.colors.to_hex((1-mix)*c1 + mix*c2)
+    """ Fades two matplotlib colors together into a gradient (see track_plots) """
+    import track_plots
+    return track_plots.colorFader(c1,c2,mix)
 
 
 #############
 ## CLASSES ##
 #############
 
-@dataclass
+@dataclass(slots=True)
 class Position:
     """ TC object containing positional and intensity information
 
@@ -317,13 +561,7 @@ class Position:
             Great circle distance between two Position objects in km
 
         """
-        radius = 6371  # Earth radius in kilometers
-        lam_1, lam_2 = radians(self.lon), radians(other.lon)
-        phi_1, phi_2 = radians(self.lat), radians(other.lat)
-        h_inside = (sin((phi_2 - phi_1) / 2)**2
-             + cos(phi_1) * cos(phi_2) * sin((lam_2 - lam_1) / 2)**2)
-        gcd = 2 * radius * asin(sqrt(h_inside))
-        return gcd
+        return float(haversine(self.lat, self.lon, other.lat, other.lon))
     
     def intensityError(self, other):
         """Calculates intensity difference between two TCs
@@ -373,7 +611,7 @@ class Position:
         return self.great_circle(other)
 
 
-@dataclass
+@dataclass(slots=True)
 class Forecast(Position):
     """ TC object containing positional and intensity information
 
@@ -394,14 +632,24 @@ class Forecast(Position):
     track_error: float
     intensity_error: float
 
-@dataclass
 class Track:
     """ TC object containing all forecast hours of a track
 
+    Stored column-wise as numpy arrays rather than a list of Position objects.
+    The return_* methods and the attributes below are the arrays themselves
+    (no copies), Position/Forecast objects are only built when the track is
+    indexed or iterated over.
+
     Attributes
     -----------
-        forecasts : List 
-            List of Forecast objects for each point along track
+        time : np.ndarray (datetime64[ns])
+            Valid time of each point along track
+        lat, lon : np.ndarray (float32)
+            TC centre at each point along track
+        mslp, vmax : np.ndarray (float32)
+            Central pressure and maximum wind at each point along track
+        track_error, intensity_error : np.ndarray (float32) or None
+            Errors against the best track, None for tracks made of Positions
         mean_terror : float
             Average track error across whole forecast
         mean_ierror : float 
@@ -413,27 +661,85 @@ class Track:
         cross_track_bias : float 
             TBA
 
-    
     """
-    forecasts : List[Position] 
-    mean_terror: float = field(init=False)
-    mean_ierror: float = field(init=False)
+    __slots__ = ('time', 'lat', 'lon', 'mslp', 'vmax', 'track_error', 'intensity_error',
+                 'mean_terror', 'mean_ierror')
+
+    def __init__(self, forecasts):
+        """ Builds a track from a list of Position or Forecast objects """
+        has_errors = len(forecasts) > 0 and isinstance(forecasts[0], Forecast)
+        self._set_columns(np.array([fcst.time for fcst in forecasts], dtype='datetime64[ns]'),
+                          [fcst.lat for fcst in forecasts], [fcst.lon for fcst in forecasts],
+                          [fcst.mslp for fcst in forecasts], [fcst.vmax for fcst in forecasts],
+                          [fcst.track_error for fcst in forecasts] if has_errors else None,
+                          [fcst.intensity_error for fcst in forecasts] if has_errors else None)
+
+    @classmethod
+    def from_arrays(cls, time, lat, lon, mslp, vmax, track_error=None, intensity_error=None):
+        """ Builds a track directly from column arrays without any per-row objects
 
-     
-    def __post_init__(self):
-        if type(self.forecasts[0]) == Forecast:
-            t_err = i_err = 0
-            for i, fcst in enumerate(self.forecasts):
-                t_err = t_err + self.forecasts[i].track_error
-                i_err = i_err + self.forecasts[i].intensity_error
-        
-            self.mean_terror = (t_err / len(self.forecasts))
-            self.mean_ierror = (i_err / len(self.forecasts))
+        Parameters
+        -----------
+        time : array_like of datetime64
+        lat, lon, mslp, vmax : array_like
+        track_error, intensity_error : array_like, optional
+            Give both for a track of forecasts
+
+        Returns
+        --------
+            : Track
+        """
+        track = cls.__new__(cls)
+        track._set_columns(time, lat, lon, mslp, vmax, track_error, intensity_error)
+        return track
+
+    def _set_columns(self, time, lat, lon, mslp, vmax, track_error, intensity_error):
+        self.time = np.asarray(time, dtype='datetime64[ns]')
+        self.lat = np.asarray(lat, dtype=np.float32)
+        self.lon = np.asarray(lon, dtype=np.float32)
+        self.mslp = np.asarray(mslp, dtype=np.float32)
+        self.vmax = np.asarray(vmax, dtype=np.float32)
+        if track_error is None:
+            self.track_error = self.intensity_error = None
+            self.mean_terror = self.mean_ierror = 0
         else:
-            self.mean_terror = self.mean_ierror = 0   
+            # means are taken before the errors are stored as float32
+            track_error = np.asarray(track_error, dtype=np.float64)
+            intensity_error = np.asarray(intensity_error, dtype=np.float64)
+            self.mean_terror = track_error.mean() if len(track_error) else np.nan
+            self.mean_ierror = intensity_error.mean() if len(intensity_error) else np.nan
+            self.track_error = track_error.astype(np.float32)
+            self.intensity_error = intensity_error.astype(np.float32)
+
+    def __len__(self):
+        return len(self.time)
+
+    def __getitem__(self, idx):
+        """ Materialises the Position (or Forecast) at idx """
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(len(self)))]
+        time = pd.Timestamp(self.time[idx])
+        # str gives the shortest repr of a float32, so 16.9 comes back as 16.9 not 16.899999618530273
+        lat, lon, mslp, vmax = (float(str(col[idx])) for col in (self.lat, self.lon, self.mslp, self.vmax))
+        if self.track_error is None:
+            return Position(time, lat, lon, mslp, vmax)
+        return Forecast(time, lat, lon, mslp, vmax,
+                        float(str(self.track_error[idx])), float(str(self.intensity_error[idx])))
+
+    def __iter__(self):
+        for idx in range(len(self)):
+            yield self[idx]
+
+    def __repr__(self):
+        return f'Track({len(self)} points, mean_terror={self.mean_terror}, mean_ierror={self.mean_ierror})'
+
+    @property
+    def forecasts(self):
+        """ List of Position/Forecast objects, built on every access so prefer the arrays """
+        return list(self)
 
     def return_coords(self):
-        """ Gives a list of (lat,lon) pairs for a given track
+        """ Gives (lon,lat) pairs for a given track
         
         Parameters
         -----------
@@ -442,13 +748,13 @@ class Track:
 
         Returns
         --------
-            : List
-            List of tuples containing coordinates of TC position for easy mapping
+            : np.ndarray
+            (n, 2) array of (lon, lat) coordinates of TC position for easy mapping
         """
-        return [(self.forecasts[idx].lon,self.forecasts[idx].lat) for (idx,fcst) in enumerate(self.forecasts)]
+        return np.column_stack((self.lon, self.lat))
     
     def return_lons(self):
-        """ Returns a list of longitudes in a given track
+        """ Returns the longitudes in a given track
         
         Parameters
         -----------
@@ -456,13 +762,13 @@ class Track:
 
         Returns
         --------
-            : List
-            List of longitudes for the TC track
+            : np.ndarray
+            Longitudes for the TC track
         """
-        return [self.forecasts[idx].lon for (idx,fcst) in enumerate(self.forecasts)]
+        return self.lon
     
     def return_lats(self):
-        """ Returns a list of latitudes in a given track
+        """ Returns the latitudes in a given track
         
         Parameters
         -----------
@@ -470,12 +776,12 @@ class Track:
 
         Returns
         --------
-            : List
-            List of latitudes for the TC track """
-        return [self.forecasts[idx].lat for (idx,fcst) in enumerate(self.forecasts)]
+            : np.ndarray
+            Latitudes for the TC track """
+        return self.lat
     
     def return_times(self):
-        """ Returns a list of times in a given track
+        """ Returns the times in a given track
         
         Parameters
         -----------
@@ -483,12 +789,12 @@ class Track:
 
         Returns
         --------
-            : List
-            List of times for the TC track """
-        return [self.forecasts[idx].time for (idx,fcst) in enumerate(self.forecasts)]
+            : np.ndarray
+            datetime64 times for the TC track """
+        return self.time
     
     def return_TE(self):
-        """ Returns a list of Track Errors in a given track
+        """ Returns the Track Errors in a given track
         
         Parameters
         -----------
@@ -496,13 +802,13 @@ class Track:
 
         Returns
         --------
-            : List
-            List of track errors for the TC track
+            : np.ndarray
+            Track errors for the TC track
         """
-        return [self.forecasts[idx].track_error for (idx,fcst) in enumerate(self.forecasts)]
+        return self.track_error
     
     def return_IE(self):
-        """ Returns a list of Intensity Errors in a given track
+        """ Returns the Intensity Errors in a given track
         
         Parameters
         -----------
@@ -510,13 +816,13 @@ class Track:
 
         Returns
         --------
-            : List
-            List of intensity errors for the TC track
+            : np.ndarray
+            Intensity errors for the TC track
         """
-        return [self.forecasts[idx].intensity_error for (idx,fcst) in enumerate(self.forecasts)]
+        return self.intensity_error
     
     def return_error_pair(self):
-        """ Returns a list of Intensity Errors in a given track
+        """ Returns (intensity error, track error) pairs in a given track
         
         Parameters
         -----------
@@ -524,11 +830,10 @@ class Track:
 
         Returns
         --------
-            : List(tuple)
-            List of intensity errors for the TC track
+            : np.ndarray
+            (n, 2) array of intensity and track errors for the TC track
         """
-        return [(self.forecasts[idx].intensity_error,self.forecasts[idx].track_error) 
-                for (idx,fcst) in enumerate(self.forecasts)]
+        return np.column_stack((self.intensity_error, self.track_error))
 
 
 @dataclass
@@ -541,16 +846,39 @@ class Model:
     ----------
         runs : Run 
             List of all runs corresponding to model
-        brier_skill_score: 
-            TBA
+        brier_skill_score : float
+            Brier skill score of the strike probabilities of the runs against
+            the best track, NaN until brier_skill is called with a best track
+            (Cyclone.brier_skill_score does so on first use)
     """
     runs : List[Track]
     brier_skill_score: float = field(init=False)
     errors : List[float] = field(init=False)
 
-    def brier_skill(self):
-        """TBA"""
-        return []
+    def brier_skill(self, best_track=None, **kwargs):
+        """ Brier skill score of the runs' strike probabilities, also stored in brier_skill_score
+
+        Each run is a single member forecast, so its strike probability is 1
+        for every grid cell it passes within strike_probability.STRIKE_RADIUS
+        of and 0 elsewhere. These are scored against the best track strikes
+        over the same times, relative to the sample climatology.
+
+        Parameters
+        ----------
+            best_track : Track, optional
+                best track to verify against, NaN is returned without one
+            **kwargs :
+                radius, res or extent for strike_probability.StrikeVerification
+
+        Returns
+        -------
+            : float
+        """
+        if best_track is None or not self.runs:
+            return np.nan
+        import strike_probability
+        self.brier_skill_score = strike_probability.StrikeVerification.from_model(self, best_track, **kwargs).brier_skill_score
+        return self.brier_skill_score
     
     def mean_errors(self):
         """TBA"""
@@ -562,7 +890,8 @@ class Model:
         return ((np.mean(t_ers)), (np.mean(i_ers)))
 
     def __post_init__(self):
-        self.brier_skill_score = self.brier_skill()
+        # scored against a best track on demand, see brier_skill
+        self.brier_skill_score = np.nan
         self.errors = self.mean_errors()
 
 
@@ -601,8 +930,17 @@ class Cyclone:
 
     def __post_init__(self):
         # Sets formation date to the first time in the best track
-        self.formation_date = self.best_track.forecasts[0].time 
-        self.dissipation_date = self.best_track.forecasts[-1].time
+        self.formation_date = self.best_track[0].time 
+        self.dissipation_date = self.best_track[-1].time
+
+    @cached_property
+    def brier_skill_score(self):
+        """ ECMWF strike probability Brier skill score (see Model.brier_skill)
+
+        Gridding the strikes is far slower than loading a cached Cyclone, so
+        it is only computed on first access.
+        """
+        return self.ecmwf.brier_skill(self.best_track)
 
     def __repr__(self) -> str:
         rep =   f"""
@@ -612,13 +950,13 @@ class Cyclone:
             Formation Date: {self.formation_date.strftime("%Y-%m-%d")}
             Dissipation Date: {self.dissipation_date.strftime("%Y-%m-%d")}
             EPS Runs: {len(self.ecmwf.runs)} runs initialised:
-                        {self.ecmwf.runs[0].forecasts[0]}
+                        {self.ecmwf.runs[0][0]}
                         ...
-                        {self.ecmwf.runs[-1].forecasts[-1]}
+                        {self.ecmwf.runs[-1][-1]}
             Best Track: 
-                        {self.best_track.forecasts[0]}
+                        {self.best_track[0]}
                         ...
-                        {self.best_track.forecasts[-1]}
+                        {self.best_track[-1]}
         )"""
         return rep
 
@@ -634,163 +972,34 @@ class Cyclone:
         #print(f'GFS Mean Total Intensity Error: {self.gfs.errors[1]}')
 
     def track_map(self):
-        """ Creates a quick track map for TC"""
-        print(f"Best track map for TC {self.name}: ")
-        # Extract coords
-        lons = self.best_track.return_lons()
-        lats = self.best_track.return_lats()
-        ax = plt.axes(projection=ccrs.PlateCarree())
-        # Auto crop map
-        ax.set_extent([min(lons)-15, max(lons)+15, min(lats)-15, max(lats)+15], crs=ccrs.PlateCarree())
-        ax.stock_img()
-        ax.coastlines()
-        ax.plot(lons,lats,transform=ccrs.PlateCarree())
+        """ Creates a quick track map for TC (drawn by track_plots) """
+        import track_plots
+        return track_plots.track_map(self)
 
     def track_map_spec_run(self,run_num):
-        """ Creates a quick track map for TC at specified run"""
-        print(f"Best track map for TC {self.name}: ")
-        # Extract coords
-        lons = self.ecmwf.runs[run_num].return_lons()
-        lats = self.ecmwf.runs[run_num].return_lats()
-        ax = plt.axes(projection=ccrs.PlateCarree())
-        # Auto crop map
-        ax.set_extent([min(lons)-15, max(lons)+15, min(lats)-15, max(lats)+15], crs=ccrs.PlateCarree())
-        ax.stock_img()
-        ax.coastlines()
-        ax.scatter(lons,lats,transform=ccrs.PlateCarree())
+        """ Creates a quick track map for TC at specified run (drawn by track_plots) """
+        import track_plots
+        return track_plots.track_map_spec_run(self, run_num)
 
     def track_map_fcast_evolution(self):
         """ Creates a map showing the track forecast evolution across
-            model runs """
-        fig = plt.figure(figsize=(10,8))
-        ax = plt.axes(projection=ccrs.PlateCarree())
-        min_lon = min(self.ecmwf.runs[0].return_lons())
-        max_lon = max(self.ecmwf.runs[0].return_lons())
-        min_lat = min(self.ecmwf.runs[0].return_lats())
-        max_lat = max(self.ecmwf.runs[0].return_lats())
-        
-        for (idx,run) in enumerate(self.ecmwf.runs):
-            lons = run.return_lons()
-            lats = run.return_lats()
-            init = min(run.return_times())
-
-            if min(lons) < min_lon : min_lon = min(lons)
-            if max(lons) < max_lon : max_lon = max(lons)
-            if min(lats) < min_lat : min_lon = min(lats)
-            if max(lats) < max_lat : min_lat = min(lats)
-
-            ax.scatter(lons,lats,transform=ccrs.PlateCarree(), 
-                       color=colorFader('red','blue',idx/len(self.ecmwf.runs)),alpha=0.5,label=init)
-
-        bt_lons = self.best_track.return_lons()
-        bt_lats = self.best_track.return_lats()
-        ax.plot(bt_lons,bt_lats,transform=ccrs.PlateCarree(),c='k',lw=0.6,label='Best Track')
-        ax.legend(prop={'size':6})
-        ax.set_extent([min(bt_lons)-15, max(bt_lons)+15, min(bt_lats)-15, max(bt_lats)+15], crs=ccrs.PlateCarree())
-        ax.stock_img()
-        ax.coastlines()
-        ax.set_title(f'ECMWF Forecast Evolution for TC {self.name}')
+            model runs (drawn by track_plots) """
+        import track_plots
+        return track_plots.track_map_fcast_evolution(self)
 
     def track_map_fcast_evolution_errors(self):
-        """ Creates a map showing the track forecast evolution across
-            model runs """
-        fig = plt.figure(figsize=(20,10))
-        ax1 = fig.add_subplot(211,projection=ccrs.PlateCarree())
-        ax2 = fig.add_subplot(221,projection=ccrs.PlateCarree())
-        min_lon = min(self.ecmwf.runs[0].return_lons())
-        max_lon = max(self.ecmwf.runs[0].return_lons())
-        min_lat = min(self.ecmwf.runs[0].return_lats())
-        max_lat = max(self.ecmwf.runs[0].return_lats())
-        
-        for (idx,run) in enumerate(self.ecmwf.runs):
-            lons = run.return_lons()
-            lats = run.return_lats()
-            init = min(run.return_times())
-
-            if min(lons) < min_lon : min_lon = min(lons)
-            if max(lons) < max_lon : max_lon = max(lons)
-            if min(lats) < min_lat : min_lon = min(lats)
-            if max(lats) < max_lat : min_lat = min(lats)
-
-            
-            errorTE = run.return_TE()
-            errorIE = run.return_IE()
-
-            sc1 = ax1.scatter(lons,lats,transform=ccrs.PlateCarree(), c = errorTE,cmap='hot_r',alpha=0.5,label=init)
-            sc2 = ax2.scatter(lons,lats,transform=ccrs.PlateCarree(), c = errorIE,cmap='seismic',alpha=0.5,label=init)
+        """ Creates maps showing the track and intensity error evolution across
+            model runs (drawn by track_plots) """
+        import track_plots
+        return track_plots.track_map_fcast_evolution_errors(self)
 
-        bt_lons = self.best_track.return_lons()
-        bt_lats = self.best_track.return_lats()
-        
-        ax1.plot(bt_lons,bt_lats,transform=ccrs.PlateCarree(),c='k',lw=0.6,label='Best Track')
-        ax1.set_extent([min(bt_lons)-15, max(bt_lons)+15, min(bt_lats)-15, max(bt_lats)+15], crs=ccrs.PlateCarree())
-        ax1.stock_img()
-        ax1.coastlines()
-        ax1.set_title(f'ECMWF Forecast Evolution of Track Error (km) for TC {self.name}')
-        cbar1 = fig.colorbar(sc1)
-        cbar1.set_label(f'Track Error (km)')
-
-        ax2.plot(bt_lons,bt_lats,transform=ccrs.PlateCarree(),c='k',lw=0.6,label='Best Track')
-        ax2.set_extent([min(bt_lons)-15, max(bt_lons)+15, min(bt_lats)-15, max(bt_lats)+15], crs=ccrs.PlateCarree())
-        ax2.stock_img()
-        ax2.coastlines()
-        ax2.set_title(f'ECMWF Forecast Evolution of Intensity Error (mbar) for TC {self.name}')
-        cbar2 = fig.colorbar(sc2)
-        cbar2.set_label(f'Intensity Error (mbar)')
-
-        fig.tight_layout()
-        
-        
 
-def track_maps(cyclones, title = 'season', ens = True):
+def track_maps(cyclones, title = 'season', ens = True, bin_px = 2):
     """ Creates a track or ensemble map for a list of Cyclone objects
 
-    Parameters
-    -----------
-    cyclones : List
-        List of cyclone objects to be mapped
-    ens : Bool
-        Defines if plot should be of the ensembles or not
-
-    Returns
-    --------
-    Map of specified TCs
-
+    Drawn by track_plots.track_maps, which is only imported when called.
+    bin_px is the screen bin size used to thin overlapping points, 0 draws
+    every point.
     """
-    # Create list of colors to run through
-    colors = [colorFader('red','blue',i/len(cyclones)) for i in range(len(cyclones))]
-    fig = plt.figure(figsize=(10,8))
-    ax = plt.axes(projection=ccrs.PlateCarree())
-    ax.set_prop_cycle(color=colors)
-    names = []
-    for cyclone in cyclones:
-        names.append(cyclone.name)
-        
-        for (idx,run) in enumerate(cyclone.ecmwf.runs):
-            lons = run.return_lons()
-            lats = run.return_lats()
-            init = min(run.return_times())
-
-            bt_lons = cyclone.best_track.return_lons()
-            bt_lats = cyclone.best_track.return_lats()
-
-            if ens == True:
-                ax.scatter(lons,lats,transform=ccrs.PlateCarree(), 
-                       color=colorFader('red','blue',idx/len(cyclone.ecmwf.runs)),alpha=0.3,label=init)
-            if title == 'season':
-                ax.plot(bt_lons,bt_lats,transform=ccrs.PlateCarree(),lw=0.8,label='Best Track')
-            else:
-                ax.plot(bt_lons,bt_lats,transform=ccrs.PlateCarree(),lw=0.8)
-    
-    ax.legend(names,prop={'size':6})
-    ax.set_extent([-103.086719,-1.390229,-4.214844,57.401515], crs=ccrs.PlateCarree())
-    ax.stock_img()
-    ax.coastlines()
-    if title == 'season':
-        ax.set_title('ECMWF Ensemble forecasts for 2020 Atlantic Hurricane Season')
-    else:
-        ax.set_title(title)
-    
-    
-
-                   
\ No newline at end of file
+    import track_plots
+    return track_plots.track_maps(cyclones, title=title, ens=ens, bin_px=bin_px)
@@ -0,0 +1,366 @@
+"""
+CREATED: 17/10/2026
+
+Summary: Plotting for Cyclone objects, split out of track_error.
+
+matplotlib and cartopy take seconds to import and pull in GUI backends, which
+every compute-only worker used to pay for on import of track_error. They are
+now only imported when a map is actually drawn: the Cyclone.track_map* methods
+and track_error.track_maps import this module on first use.
+
+The Agg backend is used unless a backend has been asked for (MPLBACKEND) or we
+are running in a notebook, so maps can be drawn and saved on headless machines.
+
+basemap / draw_evolution_map / draw_error_maps are the batch versions used by
+render_batch: the stock image and coastlines are rasterised once per extent
+and cached, and all runs go in one scatter collection per map.
+"""
+# Imports
+import hashlib
+import os
+import sys
+import tempfile
+import numpy as np
+import matplotlib as mpl
+if not os.environ.get('MPLBACKEND') and 'ipykernel' not in sys.modules:
+    mpl.use('Agg')
+import matplotlib.pyplot as plt
+import cartopy.crs as ccrs
+
+#############
+## GLOBALS ##
+#############
+
+# pre-rasterised basemaps (stock image + coastlines) are kept here, one per extent
+BASEMAP_DIR = os.path.join(os.environ.get('CYCLONE_CACHE', os.path.join(os.path.expanduser('~'), '.cache', 'hurricane-verification')), 'basemaps')
+
+# basemap resolution in pixels per degree
+BASEMAP_RES = 10
+
+# map extents are padded by this many degrees around the best track and snapped
+# outwards to a grid of the same size so nearby storms share a basemap
+EXTENT_PAD = 15
+EXTENT_SNAP = 5
+
+###############
+## FUNCTIONS ##
+###############
+
+def colorFader(c1,c2,mix=0):
+    """ Fades two matplotlib colors together into a gradient """
+    c1=np.array(mpl.colors.to_rgb(c1))
+    c2=np.array(mpl.colors.to_rgb(c2))
+    return mpl.colors.to_hex((1-mix)*c1 + mix*c2)
+
+
+def track_map(cyclone):
+    """ Creates a quick track map for TC"""
+    print(f"Best track map for TC {cyclone.name}: ")
+    # Extract coords
+    lons = cyclone.best_track.return_lons()
+    lats = cyclone.best_track.return_lats()
+    ax = plt.axes(projection=ccrs.PlateCarree())
+    # Auto crop map
+    ax.set_extent([min(lons)-15, max(lons)+15, min(lats)-15, max(lats)+15], crs=ccrs.PlateCarree())
+    ax.stock_img()
+    ax.coastlines()
+    ax.plot(lons,lats,transform=ccrs.PlateCarree())
+
+
+def track_map_spec_run(cyclone,run_num):
+    """ Creates a quick track map for TC at specified run"""
+    print(f"Best track map for TC {cyclone.name}: ")
+    # Extract coords
+    lons = cyclone.ecmwf.runs[run_num].return_lons()
+    lats = cyclone.ecmwf.runs[run_num].return_lats()
+    ax = plt.axes(projection=ccrs.PlateCarree())
+    # Auto crop map
+    ax.set_extent([min(lons)-15, max(lons)+15, min(lats)-15, max(lats)+15], crs=ccrs.PlateCarree())
+    ax.stock_img()
+    ax.coastlines()
+    ax.scatter(lons,lats,transform=ccrs.PlateCarree())
+
+
+def track_map_fcast_evolution(cyclone):
+    """ Creates a map showing the track forecast evolution across
+        model runs """
+    fig = plt.figure(figsize=(10,8))
+    ax = plt.axes(projection=ccrs.PlateCarree())
+    min_lon = min(cyclone.ecmwf.runs[0].return_lons())
+    max_lon = max(cyclone.ecmwf.runs[0].return_lons())
+    min_lat = min(cyclone.ecmwf.runs[0].return_lats())
+    max_lat = max(cyclone.ecmwf.runs[0].return_lats())
+
+    for (idx,run) in enumerate(cyclone.ecmwf.runs):
+        lons = run.return_lons()
+        lats = run.return_lats()
+        init = min(run.return_times())
+
+        if min(lons) < min_lon : min_lon = min(lons)
+        if max(lons) < max_lon : max_lon = max(lons)
+        if min(lats) < min_lat : min_lon = min(lats)
+        if max(lats) < max_lat : min_lat = min(lats)
+
+        ax.scatter(lons,lats,transform=ccrs.PlateCarree(),
+                   color=colorFader('red','blue',idx/len(cyclone.ecmwf.runs)),alpha=0.5,label=init)
+
+    bt_lons = cyclone.best_track.return_lons()
+    bt_lats = cyclone.best_track.return_lats()
+    ax.plot(bt_lons,bt_lats,transform=ccrs.PlateCarree(),c='k',lw=0.6,label='Best Track')
+    ax.legend(prop={'size':6})
+    ax.set_extent([min(bt_lons)-15, max(bt_lons)+15, min(bt_lats)-15, max(bt_lats)+15], crs=ccrs.PlateCarree())
+    ax.stock_img()
+    ax.coastlines()
+    ax.set_title(f'ECMWF Forecast Evolution for TC {cyclone.name}')
+
+
+def track_map_fcast_evolution_errors(cyclone):
+    """ Creates a map showing the track forecast evolution across
+        model runs """
+    fig = plt.figure(figsize=(20,10))
+    ax1 = fig.add_subplot(211,projection=ccrs.PlateCarree())
+    ax2 = fig.add_subplot(221,projection=ccrs.PlateCarree())
+    min_lon = min(cyclone.ecmwf.runs[0].return_lons())
+    max_lon = max(cyclone.ecmwf.runs[0].return_lons())
+    min_lat = min(cyclone.ecmwf.runs[0].return_lats())
+    max_lat = max(cyclone.ecmwf.runs[0].return_lats())
+
+    for (idx,run) in enumerate(cyclone.ecmwf.runs):
+        lons = run.return_lons()
+        lats = run.return_lats()
+        init = min(run.return_times())
+
+        if min(lons) < min_lon : min_lon = min(lons)
+        if max(lons) < max_lon : max_lon = max(lons)
+        if min(lats) < min_lat : min_lon = min(lats)
+        if max(lats) < max_lat : min_lat = min(lats)
+
+
+        errorTE = run.return_TE()
+        errorIE = run.return_IE()
+
+        sc1 = ax1.scatter(lons,lats,transform=ccrs.PlateCarree(), c = errorTE,cmap='hot_r',alpha=0.5,label=init)
+        sc2 = ax2.scatter(lons,lats,transform=ccrs.PlateCarree(), c = errorIE,cmap='seismic',alpha=0.5,label=init)
+
+    bt_lons = cyclone.best_track.return_lons()
+    bt_lats = cyclone.best_track.return_lats()
+
+    ax1.plot(bt_lons,bt_lats,transform=ccrs.PlateCarree(),c='k',lw=0.6,label='Best Track')
+    ax1.set_extent([min(bt_lons)-15, max(bt_lons)+15, min(bt_lats)-15, max(bt_lats)+15], crs=ccrs.PlateCarree())
+    ax1.stock_img()
+    ax1.coastlines()
+    ax1.set_title(f'ECMWF Forecast Evolution of Track Error (km) for TC {cyclone.name}')
+    cbar1 = fig.colorbar(sc1)
+    cbar1.set_label(f'Track Error (km)')
+
+    ax2.plot(bt_lons,bt_lats,transform=ccrs.PlateCarree(),c='k',lw=0.6,label='Best Track')
+    ax2.set_extent([min(bt_lons)-15, max(bt_lons)+15, min(bt_lats)-15, max(bt_lats)+15], crs=ccrs.PlateCarree())
+    ax2.stock_img()
+    ax2.coastlines()
+    ax2.set_title(f'ECMWF Forecast Evolution of Intensity Error (mbar) for TC {cyclone.name}')
+    cbar2 = fig.colorbar(sc2)
+    cbar2.set_label(f'Intensity Error (mbar)')
+
+    fig.tight_layout()
+
+
+def _thin_points(lons, lats, values, extent, shape, nlevels=32):
+    """ Screen-space downsample of points for a map
+
+    The extent is divided into a grid of shape (rows, cols) bins (a couple of
+    pixels each) and values (colour mixes in [0, 1]) into nlevels levels, and
+    one point is kept per (bin, level). Points hidden under others of the same
+    colour are dropped, so the number drawn is bounded by the map size rather
+    than the number of runs.
+
+    Returns
+    -------
+        keep : np.ndarray (int)
+            indices of the points to draw
+    """
+    lons, lats, values = (np.asarray(x, dtype=float) for x in (lons, lats, values))
+    rows, cols = shape
+    col = np.floor((lons - extent[0]) / (extent[1] - extent[0]) * cols)
+    row = np.floor((lats - extent[2]) / (extent[3] - extent[2]) * rows)
+    level = np.floor(np.clip(values, 0, 1) * (nlevels - 1))
+    inside = (col >= 0) & (col < cols) & (row >= 0) & (row < rows) & np.isfinite(level)
+    idx = np.flatnonzero(inside)
+    key = (row[idx].astype(np.int64) * cols + col[idx].astype(np.int64)) * nlevels + level[idx].astype(np.int64)
+    _, first = np.unique(key, return_index=True)
+    return np.sort(idx[first])
+
+
+def track_maps(cyclones, title = 'season', ens = True, bin_px = 2):
+    """ Creates a track or ensemble map for a list of Cyclone objects
+
+    Each storm's runs are concatenated into columnar arrays and drawn as a
+    single scatter collection (coloured red to blue from first to last run),
+    thinned to one point per bin_px screen bin and colour level. All best
+    tracks are one LineCollection and the legend (one entry per storm) is built
+    once, so the number of artists and the render time do not grow with the
+    number of runs.
+
+    Parameters
+    -----------
+    cyclones : List
+        List of cyclone objects to be mapped
+    ens : Bool
+        Defines if plot should be of the ensembles or not
+    bin_px : int
+        Size in pixels of the screen bins used to thin overlapping points,
+        0 draws every point
+
+    Returns
+    --------
+    Map of specified TCs
+
+    """
+    extent = [-103.086719,-1.390229,-4.214844,57.401515]
+    # Create list of colors to run through
+    colors = [colorFader('red','blue',i/len(cyclones)) for i in range(len(cyclones))]
+    fig = plt.figure(figsize=(10,8))
+    ax = plt.axes(projection=ccrs.PlateCarree())
+    ax.set_extent(extent, crs=ccrs.PlateCarree())
+    ax.stock_img()
+    ax.coastlines()
+    if bin_px:
+        ax.apply_aspect()
+        bbox = ax.get_window_extent()
+        shape = (max(int(bbox.height // bin_px), 1), max(int(bbox.width // bin_px), 1))
+    cmap = mpl.colors.LinearSegmentedColormap.from_list('runs', ['red', 'blue'])
+    segments = []
+    for cyclone in cyclones:
+        segments.append(np.column_stack([cyclone.best_track.lon, cyclone.best_track.lat]))
+        if ens == True and cyclone.ecmwf.runs:
+            run_idx, cols = _run_columns(cyclone)
+            mix = run_idx / len(cyclone.ecmwf.runs)
+            keep = _thin_points(cols['lon'], cols['lat'], mix, extent, shape) if bin_px else slice(None)
+            ax.scatter(cols['lon'][keep], cols['lat'][keep], c=mix[keep], cmap=cmap, vmin=0, vmax=1,
+                       alpha=0.3, transform=ccrs.PlateCarree())
+    ax.add_collection(mpl.collections.LineCollection(segments, colors=colors, linewidths=0.8,
+                                                     transform=ccrs.PlateCarree()))
+    handles = [mpl.lines.Line2D([], [], color=color, lw=0.8) for color in colors]
+    ax.legend(handles, [cyclone.name for cyclone in cyclones], prop={'size':6})
+    if title == 'season':
+        ax.set_title('ECMWF Ensemble forecasts for 2020 Atlantic Hurricane Season')
+    else:
+        ax.set_title(title)
+
+
+def storm_extent(cyclone, pad=EXTENT_PAD, snap=EXTENT_SNAP):
+    """ Map extent [lon0, lon1, lat0, lat1] around a storm's best track, snapped to a grid """
+    lons, lats = cyclone.best_track.lon, cyclone.best_track.lat
+    return [float(np.floor((lons.min() - pad) / snap) * snap), float(np.ceil((lons.max() + pad) / snap) * snap),
+            float(max(np.floor((lats.min() - pad) / snap) * snap, -90)),
+            float(min(np.ceil((lats.max() + pad) / snap) * snap, 90))]
+
+
+def basemap(extent, res=BASEMAP_RES, cache_dir=None):
+    """ Stock image and coastlines for an extent rasterised to an RGB array
+
+    Drawing stock_img() and coastlines() is most of the cost of a map, so it is
+    done once per extent and the image is cached as .npy (written atomically,
+    so parallel workers can share the cache). Maps then just imshow it.
+
+    Parameters
+    ----------
+        extent : list
+            [lon0, lon1, lat0, lat1] in degrees
+        res : int, optional
+            pixels per degree
+        cache_dir : str, optional
+            defaults to BASEMAP_DIR
+
+    Returns
+    -------
+        image : np.ndarray (uint8)
+            (rows, cols, 3), north up, covering extent exactly
+    """
+    cache_dir = BASEMAP_DIR if cache_dir is None else cache_dir
+    key = hashlib.sha1(repr((list(map(float, extent)), res)).encode()).hexdigest()
+    filepath = os.path.join(cache_dir, key + '.npy')
+    if os.path.isfile(filepath):
+        return np.load(filepath)
+    width = int(round((extent[1] - extent[0]) * res))
+    height = int(round((extent[3] - extent[2]) * res))
+    fig = plt.figure(figsize=(width / 100, height / 100), dpi=100)
+    ax = fig.add_axes([0, 0, 1, 1], projection=ccrs.PlateCarree())
+    ax.set_extent(extent, crs=ccrs.PlateCarree())
+    ax.stock_img()
+    ax.coastlines()
+    ax.set_axis_off()
+    fig.canvas.draw()
+    image = np.asarray(fig.canvas.buffer_rgba())[..., :3].copy()
+    plt.close(fig)
+    os.makedirs(cache_dir, exist_ok=True)
+    fd, tmpname = tempfile.mkstemp(dir=cache_dir, suffix='.npy')
+    with os.fdopen(fd, 'wb') as fid:
+        np.save(fid, image)
+    # mkstemp creates files 0600, give the usual permissions before the rename
+    umask = os.umask(0)
+    os.umask(umask)
+    os.chmod(tmpname, 0o666 & ~umask)
+    os.replace(tmpname, filepath)
+    return image
+
+
+def _run_columns(cyclone):
+    """ All runs of a cyclone concatenated, with the run number of each point """
+    runs = cyclone.ecmwf.runs
+    run_idx = np.concatenate([np.full(len(run), idx) for idx, run in enumerate(runs)]) if runs else np.array([])
+    cols = {col : np.concatenate([getattr(run, col) for run in runs]) if runs else np.array([])
+            for col in ['lon', 'lat', 'track_error', 'intensity_error']}
+    return run_idx, cols
+
+
+def _map_axes(fig, position, image, extent):
+    ax = fig.add_subplot(position, projection=ccrs.PlateCarree())
+    ax.imshow(image, extent=extent, origin='upper', transform=ccrs.PlateCarree(), interpolation='nearest')
+    ax.set_extent(extent, crs=ccrs.PlateCarree())
+    return ax
+
+
+def draw_evolution_map(cyclone, image, extent):
+    """ track_map_fcast_evolution on a pre-rasterised basemap
+
+    Every run is drawn in a single scatter collection coloured by run number
+    (red for the first run through to blue for the last) rather than one
+    artist per run.
+
+    Returns
+    -------
+        fig : matplotlib.figure.Figure
+    """
+    run_idx, cols = _run_columns(cyclone)
+    fig = plt.figure(figsize=(10,8))
+    ax = _map_axes(fig, 111, image, extent)
+    cmap = mpl.colors.LinearSegmentedColormap.from_list('runs', ['red', 'blue'])
+    ax.scatter(cols['lon'], cols['lat'], c=run_idx, cmap=cmap, vmin=0, vmax=max(len(cyclone.ecmwf.runs), 1),
+               alpha=0.5, s=12, transform=ccrs.PlateCarree())
+    ax.plot(cyclone.best_track.lon, cyclone.best_track.lat, transform=ccrs.PlateCarree(), c='k', lw=0.6)
+    ax.set_title(f'ECMWF Forecast Evolution for TC {cyclone.name}')
+    return fig
+
+
+def draw_error_maps(cyclone, image, extent):
+    """ track_map_fcast_evolution_errors on a pre-rasterised basemap
+
+    Track and intensity error maps, each a single scatter collection.
+
+    Returns
+    -------
+        fig : matplotlib.figure.Figure
+    """
+    _, cols = _run_columns(cyclone)
+    fig = plt.figure(figsize=(10,12))
+    ie_max = np.nanmax(np.abs(cols['intensity_error'])) if len(cols['intensity_error']) else 1
+    for position, error, cmap, norm, label in (
+            (211, 'track_error', 'hot_r', None, 'Track Error (km)'),
+            (212, 'intensity_error', 'seismic', mpl.colors.Normalize(-ie_max, ie_max), 'Intensity Error (mbar)')):
+        ax = _map_axes(fig, position, image, extent)
+        sc = ax.scatter(cols['lon'], cols['lat'], c=cols[error], cmap=cmap, norm=norm, alpha=0.5, s=12,
+                        transform=ccrs.PlateCarree())
+        ax.plot(cyclone.best_track.lon, cyclone.best_track.lat, transform=ccrs.PlateCarree(), c='k', lw=0.6)
+        ax.set_title(f'ECMWF Forecast Evolution of {label} for TC {cyclone.name}')
+        fig.colorbar(sc, ax=ax, label=label, shrink=0.8)
+    return fig
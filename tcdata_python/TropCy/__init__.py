@@ -7,4 +7,4 @@
 """
 
     
-__all__ = ['.atcf','.cxml','.nhc_ftp']
+__all__ = ['.atcf','.cxml','.nhc_ftp','.track_store','.track_index','.geodesy']
@@ -1,6 +1,9 @@
 """Simple functions to currently aid in reading/writing ATCF format files"""
 #ATCF read / Write Module
 # pylint: disable=W0311, C0326, C0103
+import os
+import tempfile
+import numpy as np
 import pandas as pd
 
 def strip(text):
@@ -78,6 +81,47 @@ def filename(name,basin, storm, date):
     fmt_string = string.format(name=name,time=date )
     return fmt_string
 
+def line_key(line):
+    """Sort key for an atcf line -- (init time, tech, tau)"""
+    fields = line.split(',')
+    return int(fields[2]), fields[4].strip(), int(fields[5])
+
+def sort_unique(lines):
+    """Order atcf lines by init time, tech and tau and drop duplicates
+    Later lines win so re-converted data replaces what was there.
+    Lines that are not atcf records (e.g. csv headers) are dropped"""
+    unique = {}
+    for line in lines:
+        try:
+            unique[line_key(line)] = line
+        except (IndexError, ValueError):
+            continue
+    return [unique[key] for key in sorted(unique)]
+
+def write_adeck(fname, lines, header=None, append=False):
+    """Write ordered, unique atcf lines to fname in one go
+    If append the existing contents of fname are merged in first.
+    Written to a temporary file in the same directory and renamed over fname
+    so readers never see a partially written file."""
+    if append and os.path.isfile(fname):
+        with open(fname) as fid:
+            lines = fid.readlines() + list(lines)
+    lines = sort_unique(lines)
+    fd, tmpname = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(fname)), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as fid:
+            if header is not None:
+                fid.write(header)
+            fid.writelines(lines)
+        # mkstemp creates files 0600, give the usual permissions before the rename
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(tmpname, 0o666 & ~umask)
+        os.replace(tmpname, fname)
+    except BaseException:
+        os.remove(tmpname)
+        raise
+
 # def read_all_and_correct_vmax(filename):
 #   from numpy import genfromtxt
 #   import csv
@@ -99,28 +143,113 @@ def read_storm_names(fname):
   return datum[ ['name', 'basin', 'number','year', 'type', 'startdate', 'enddate','id'] ]
   
 
-def read_adeck(fname, tech=None, date=None):
-  """Read adeck from filename into pandas dataframe"""
-  ## Tried versions of parsing colums in the read_csv func and they were much slower
-  atcfNames = ["basin","number","datetime","tnum","tech","tau","lat","lon","vmax","mslp","type","rad","windcode","rad1",
+ATCF_NAMES = ["basin","number","datetime","tnum","tech","tau","lat","lon","vmax","mslp","type","rad","windcode","rad1",
             "rad2","rad3","rad4","pouter","router","rmw","gusts","eye","subregion"]
-  converters = {   'lat' : str2ll,
-                   'lon' : str2ll}
-  # n.b. ' *, *' takes care of stripping whitespace
-  #  python engine allows for providing too many column names
-  #  datetime as converter is super slow, str2ll is neglible time addition
-  datum = pd.read_csv(fname, sep=' *, *',engine='python', index_col=False,
-     usecols=range(len(atcfNames)),
-     names=atcfNames,
-     converters=converters )
-  #  Quicker to process dates in series after than as a converter
-  datum['datetime'] = pd.to_datetime(datum['datetime'], format="%Y%m%d%H")
-  datum['validtime'] =  datum['datetime']  + pd.to_timedelta(datum['tau'], unit="h")
-  datum = datum.loc[ (datum['lat']!=0) | (datum['lon']!=0) ]
+# Compact dtypes for the columns we actually use, everything else is left to pandas
+ATCF_DTYPES = {'basin':'category', 'number':'int16', 'datetime':'category', 'tnum':'float32', 'tech':'category',
+               'tau':'int16', 'lat':'category', 'lon':'category', 'vmax':'float32', 'mslp':'float32',
+               'type':'category', 'windcode':'category'}
+
+def str2ll_column(x):
+    """Convert column of atcf str (e.g. 229N, 1116W) to float32 latlon
+    Parsed once per unique value via the categorical codes, not once per row"""
+    x = x.astype('category')
+    cats = x.cat.categories.astype(str).str.strip()
+    sign = np.where(cats.str[-1].isin(['S','W']), -1, 1)
+    values = np.append(pd.to_numeric(cats.str[:-1], errors='coerce') * sign / 10, np.nan).astype('float32')
+    # code -1 (missing) picks up the nan appended above
+    return values[x.cat.codes.values]
+
+def _max_fields(fid, blocksize=2**24):
+    """Widest line (in comma separated fields) of an open binary file
+    Scanned in blocks so the whole file is never held in memory"""
+    widest = carry = 0
+    for block in iter(lambda: fid.read(blocksize), b''):
+        data = np.frombuffer(block, dtype=np.uint8)
+        commas = np.flatnonzero(data == ord(','))
+        ends = np.flatnonzero(data == ord('\n'))
+        if len(ends) == 0:
+            carry += len(commas)
+            continue
+        counts = np.diff(np.searchsorted(commas, ends), prepend=0)
+        counts[0] += carry
+        widest = max(widest, int(counts.max()))
+        carry = len(commas) - int(np.searchsorted(commas, ends[-1]))
+    return max(widest, carry) + 1
+
+def _as_list(x):
+    """Allow single values as well as lists for filters"""
+    if isinstance(x, (str, int)) or not hasattr(x, '__iter__'):
+        return [x]
+    return list(x)
+
+def _strip_categories(col):
+  """Strip a categorical column's categories, merging spellings that differ only by padding"""
+  cats = col.cat.categories.astype(str).str.strip()
+  if cats.is_unique:
+    return col.cat.rename_categories(cats)
+  codes = col.cat.codes.values
+  return pd.Series(pd.Categorical(np.where(codes >= 0, np.asarray(cats, dtype=object)[codes], None)), index=col.index)
+
+def _adeck_chunk(datum, tech=None, date=None, tau=None, basin=None):
+  """Tidy and filter one chunk of raw adeck columns
+  Filters are applied on the cheap raw columns before lat/lon are parsed"""
+  # a copy, not a view, as the categorical columns are reassigned below
+  datum = datum[ATCF_NAMES].copy()
+  # only trailing whitespace is left on strings, strip the categories rather than every row
+  for col in ['basin', 'tech', 'type', 'windcode']:
+    datum[col] = _strip_categories(datum[col])
+  #  Few unique init times so convert the categories and take
+  dates = datum['datetime']
+  init = pd.to_datetime(dates.cat.categories.astype(str).str.strip(), format="%Y%m%d%H", errors='coerce')
+  keep = np.ones(len(datum), dtype=bool)
   if tech is not None:
-    datum = datum.loc[ datum['tech'].isin(tech) ]
+    keep &= datum['tech'].isin(_as_list(tech)).values
+  if basin is not None:
+    keep &= datum['basin'].str.upper().isin([b.upper() for b in _as_list(basin)]).values
+  if tau is not None:
+    keep &= datum['tau'].isin(_as_list(tau)).values
   if date is not None:
-    datum = datum.loc[ datum['datetime']==pd.to_datetime(date) ]
+    keep &= np.isin(dates.cat.codes.values, np.flatnonzero(init.isin(pd.to_datetime(_as_list(date)))))
+  datum = datum.loc[keep].copy()
+  datum['number'] = datum['number'].astype('int16')
+  datum['tau'] = datum['tau'].astype('int16')
+  datum['lat'] = str2ll_column(datum['lat'])
+  datum['lon'] = str2ll_column(datum['lon'])
+  # missing dates have code -1, keep them NaT rather than wrapping to the last init
+  datum['datetime'] = init.take(datum['datetime'].cat.codes.values, allow_fill=True, fill_value=pd.NaT)
+  datum['validtime'] =  datum['datetime']  + pd.to_timedelta(datum['tau'], unit="h")
+  return datum.loc[ (datum['lat']!=0) | (datum['lon']!=0) ]
+
+def _iter_adeck(fname, chunksize, **filters):
+  """Generator of filtered adeck chunks"""
+  with open(os.path.expanduser(fname), 'rb') as fid:
+    # lines are ragged, give the c parser enough names for the widest line then drop the extras
+    nfields = _max_fields(fid)
+    fid.seek(0)
+    names = ATCF_NAMES + ["extra%d"%i for i in range(nfields - len(ATCF_NAMES))]
+    reader = pd.read_csv(fid, sep=',', skipinitialspace=True, header=None, index_col=False,
+       names=names, chunksize=chunksize,
+       dtype={k: v for k, v in ATCF_DTYPES.items() if k not in ('number', 'tau')} )
+    for datum in reader:
+      yield _adeck_chunk(datum, **filters)
+
+def read_adeck(fname, tech=None, date=None, tau=None, basin=None, chunksize=2**17, iterator=False):
+  """Read adeck from filename into pandas dataframe
+
+  The file is read chunksize lines at a time and the tech, date (init time),
+  tau and basin filters are applied to each chunk as it is read, so peak
+  memory scales with the matching rows rather than the whole file.
+  Each filter takes a single value or a list.
+  If iterator is True a generator of filtered DataFrame chunks is returned.
+  """
+  chunks = _iter_adeck(fname, chunksize, tech=tech, date=date, tau=tau, basin=basin)
+  if iterator:
+    return chunks
+  datum = pd.concat(chunks, ignore_index=True)
+  # chunks may have different categories which concat turns back into objects
+  for col in ['basin', 'tech', 'type', 'windcode']:
+    datum[col] = datum[col].astype('category')
   return datum  
 
     
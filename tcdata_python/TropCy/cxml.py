@@ -106,6 +106,85 @@ def get_analysis(xml_root):
   return retdata
 
 
+def iter_records(fname):
+  """Stream every analysis and forecast fix in a cxml file as flat records
+
+  Walks the file once with iterparse rather than querying the whole tree per
+  storm, member and hour.  Elements are cleared as soon as they are consumed.
+  Analysis records carry name/number/basin/lat/lon/time, forecast records
+  carry the same keys get_forecasts returns plus type, ID and member.
+  """
+  context = ET.iterparse(fname, events=('start', 'end'))
+  root = None
+  dtype = member = cycloneID = None
+  for event, elem in context:
+    if event == 'start':
+      if root is None:
+        root = elem
+      elif elem.tag == 'data':
+        dtype = elem.attrib.get('type')
+        member = elem.attrib.get('member')
+      elif elem.tag == 'disturbance':
+        cycloneID = elem.attrib.get('ID')
+      continue
+    if elem.tag == 'fix' and dtype in ("forecast", "ensembleForecast") and 'hour' in elem.attrib:
+      retdata = {'type': dtype, 'ID': cycloneID}
+      if dtype == "ensembleForecast":
+        retdata['member'] = int(member)
+        retdata['tech'] = "EE%02.0f"%int(member)
+      else:
+        retdata['member'] = -999
+        retdata['tech'] = "ECMF"
+      retdata['lat'] = parse_variable(elem, 'latitude')
+      retdata['lon'] = parse_variable(elem, 'longitude')
+      retdata['time'] = parse_variable(elem, 'time')
+      retdata['fhr'] = parse_variable(elem, 'fhr')
+      retdata['mslp'] = parse_variable(elem, 'mslp')
+      retdata['vmax'] = parse_variable(elem, 'mwnd')
+      elem.clear()
+      yield retdata
+    elif elem.tag == 'disturbance':
+      if dtype == 'analysis':
+        retdata = {'type': dtype, 'ID': cycloneID}
+        try:
+          retdata['name'] = elem.find('cycloneName').text
+        except:
+          pass
+        try:
+          retdata['number'] = int(elem.find('cycloneNumber').text )
+          retdata['basin']  = elem.find('basin').text
+          retdata['lat']    = parse_variable(elem, 'latitude')
+          retdata['lon']    = parse_variable(elem, 'longitude')
+          retdata['time']   = parse_variable(elem, 'time')
+          yield retdata
+        except:
+          pass
+      elem.clear()
+      cycloneID = None
+    elif elem.tag == 'data':
+      dtype = member = None
+      root.clear()
+
+
+def decode_file(fname):
+  """Single pass decode of a cxml file
+
+  Returns the get_analysis dictionary alongside a dictionary of forecast
+  records keyed by (ID, tech, fhr).  As with get_forecasts the last matching
+  fix wins and empty fixes (lat == lon == mslp == 0) are dropped.
+  """
+  anl_data = {}
+  forecasts = {}
+  for rec in iter_records(fname):
+    if rec['type'] == 'analysis':
+      anl_data[rec['ID']] = {k: v for k, v in rec.items() if k not in ('type', 'ID')}
+    else:
+      forecasts[(rec['ID'], rec['tech'], rec['fhr'])] = rec
+  forecasts = {k: rec for k, rec in forecasts.items()
+               if not rec['lat'] == rec['lon'] == rec['mslp'] == 0}
+  return anl_data, forecasts
+
+
 ###  Beginning of an output function. Currently just dump to std out
 def print_output(time, idno, name, basin, data):
     print (idno, data)
@@ -1,4 +1,5 @@
 import numpy as np
+from .geodesy import haversine
 
 def calculate_ellipse(group, min_no=0):
     ''' Given Pandas group with lat,lon calculate EOF for Major/Minor
@@ -20,22 +21,90 @@ def calculate_ellipse(group, min_no=0):
                               'ell_angle' : angls[0]          })
         return retval
     except Exception as e:
-        print( mean_locs, sigm_locs, rho )
+        print( group[ ['lat', 'lon'] ].mean(), sigm_locs, rho )
         print("======")
         return 
 
+def _ellipse_from_moments(count, var_lat, var_lon, cov, min_no=0):
+    ''' Closed form eigen decomposition of many 2x2 lat/lon covariance matrices
+    [[var_lat, cov], [cov, var_lon]] at once, same rejection rules as calculate_ellipse.
+    Returns major, minor, angle (nan where rejected) and the mask of accepted groups'''
+    valid = (count >= max(min_no, 2)) & (var_lat > 0.01) & (var_lon > 0.01)
+    half_tr = 0.5*(var_lat + var_lon)
+    root = np.sqrt( (0.5*(var_lat - var_lon))**2 + cov**2 )
+    l1 = half_tr + root
+    l2 = half_tr - root
+    # major eigenvector is (cov, l1 - var_lat) in (lat, lon), or (l1 - var_lon, cov) when cov == 0
+    v_lat = np.where( cov != 0, cov, np.where(var_lat >= var_lon, 1., 0.) )
+    v_lon = np.where( cov != 0, l1 - var_lat, np.where(var_lat >= var_lon, 0., 1.) )
+    # anticlockwise from the lon axis, which is what calculate_ellipse's row indexed eig_vec works out to
+    angle = np.mod( np.degrees( np.arctan2(v_lat, v_lon) ), 180 )
+    major = np.where( valid, np.sqrt(np.abs(l1)), np.nan )
+    minor = np.where( valid, np.sqrt(np.abs(l2)), np.nan )
+    angle = np.where( valid, angle, np.nan )
+    return major, minor, angle, valid
+
+
+def batch_ellipse(data, by=('datetime', 'tau'), min_no=0):
+    ''' calculate_ellipse for every group of data in one go
+    Group sizes, lat/lon variances and covariance (ddof=1, as pandas) come from a
+    single grouped sum and the 2x2 eigenproblems are solved in closed form rather
+    than with np.linalg.eig per group.
+    Returns a DataFrame indexed by the group keys with ell_major, ell_minor and
+    ell_angle (nan for groups calculate_ellipse would reject), count and valid.
+    ell_angle is folded into [0, 180) as the eigenvector sign is arbitrary'''
+    import pandas as pd
+    by = list(by)
+    lat = data['lat'].values.astype(float)
+    lon = data['lon'].values.astype(float)
+    # built from values so a non unique index (e.g. from pd.concat) can't misalign rows
+    moments = pd.DataFrame( { 'lat' : lat, 'lon' : lon, 'lat2' : lat**2, 'lon2' : lon**2, 'latlon' : lat*lon } )
+    for key in by:
+        moments[key] = data[key].values
+    moments = moments.dropna( subset=['lat', 'lon'] )
+    grouped = moments.groupby( by )
+    sums = grouped.sum()
+    count = grouped.size().reindex( sums.index ).values.astype(float)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        dof = count - 1
+        var_lat = (sums['lat2'].values - sums['lat'].values**2/count) / dof
+        var_lon = (sums['lon2'].values - sums['lon'].values**2/count) / dof
+        cov = (sums['latlon'].values - sums['lat'].values*sums['lon'].values/count) / dof
+        major, minor, angle, valid = _ellipse_from_moments( count, var_lat, var_lon, cov, min_no )
+    return pd.DataFrame( { 'ell_major' : major, 'ell_minor' : minor, 'ell_angle' : angle,
+                           'count' : count.astype(int), 'valid' : valid }, index=sums.index )
+
+
+def ensemble_ellipse(lat, lon, axis=1, min_no=0):
+    ''' batch_ellipse for dense NaN padded ensemble arrays, e.g. (init, member, lead)
+    reduced over the member axis. Returns major, minor, angle and valid arrays
+    with that axis removed'''
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    present = ~(np.isnan(lat) | np.isnan(lon))
+    count = present.sum(axis=axis).astype(float)
+    lat0 = np.where(present, lat, 0.)
+    lon0 = np.where(present, lon, 0.)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_lat = lat0.sum(axis=axis) / count
+        mean_lon = lon0.sum(axis=axis) / count
+        dlat = np.where(present, lat - np.expand_dims(mean_lat, axis), 0.)
+        dlon = np.where(present, lon - np.expand_dims(mean_lon, axis), 0.)
+        dof = count - 1
+        var_lat = (dlat**2).sum(axis=axis) / dof
+        var_lon = (dlon**2).sum(axis=axis) / dof
+        cov = (dlat*dlon).sum(axis=axis) / dof
+        return _ellipse_from_moments( count, var_lat, var_lon, cov, min_no )
+
+
 def haversine_distance_angle( lat1, lon1, lat2, lon2):
-    '''Simple implementation of calculating great circle distance and angle between points
-    using haversine, hopefully numpy allows use of series rather than singular values'''
-    R = 6371. # Earths Circumferences  [km]
-    rlat1 = np.radians( lat1 )
-    rlon1 = np.radians( lon1 )
-    rlat2 = np.radians( lat2 )
-    rlon2 = np.radians( lon2 )
-    d = np.arccos( np.sin(rlat1)*np.sin(rlat2) + np.cos(rlat1)*np.cos(rlat2)*np.cos(rlon2-rlon1) ) * R
-    brng = np.degrees( np.arctan2(np.cos(rlat1)*np.sin(rlat2)- \
-                      np.sin(rlat1)*np.cos(rlat2)*np.cos(rlon2-rlon1), \
-                                np.sin(rlon2-rlon1)*np.cos(rlat2)) )
+    '''Great circle distance [km] and angle between points, broadcasting over arrays/series.
+    The angle is the initial bearing measured anticlockwise from east, in (-180, 180].
+    Computed by geodesy.haversine which stays accurate at small separations'''
+    d, brng = haversine( lat1, lon1, lat2, lon2, bearing=True )
+    # clockwise from north to anticlockwise from east
+    np.subtract( 90, brng, out=brng )
+    brng[brng > 180] -= 360
     return d, brng
 
 
@@ -47,13 +116,30 @@ def absolute_track_spread(data):
     return data
 
 
+def track_heading(lat, lon):
+    ''' Heading of a track at each point, in the same convention as the
+    haversine_distance_angle bearing (degrees anticlockwise from east).
+    Centred differences between neighbouring points, one sided at the ends'''
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    if len(lat) < 2:
+        return np.full(len(lat), np.nan)
+    prev = np.r_[0, np.arange(len(lat)-1)]
+    nxt = np.r_[np.arange(1, len(lat)), len(lat)-1]
+    _, brng = haversine_distance_angle( lat[prev], lon[prev], lat[nxt], lon[nxt] )
+    return brng
+
 
-# def along_across_error(data):
-#     lat2 = np.radians( data['lat'].mean() )
-#     lon2 = np.radians( data['lon'].mean() )
-#     d, brng = [ haversine_distance_angle()]
-#     data['ats'] = d
-#     return data
+def along_across_error(lat, lon, bt_lat, bt_lon, bt_heading):
+    ''' Split forecast position errors [km] into along track and cross track
+    components relative to the best track heading at the verifying time.
+    All arguments broadcast against each other, so a whole (init, member, lead)
+    ensemble goes through in one call with the best track given as (init, 1, lead).
+    Positive along track error is ahead of the best track (too fast),
+    positive cross track error is to the right of it'''
+    d, brng = haversine_distance_angle( bt_lat, bt_lon, lat, lon )
+    rel = np.radians( brng - bt_heading )
+    return d*np.cos(rel), -d*np.sin(rel)
 
 
 
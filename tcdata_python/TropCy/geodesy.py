@@ -0,0 +1,61 @@
+''' Great circle distance and bearing kernel shared by TropCy and errorCalcModules '''
+import numpy as np
+
+EARTH_RADIUS = 6371. # Earths mean radius [km]
+
+
+def haversine(lat1, lon1, lat2, lon2, bearing=False, dtype=np.float64, out=None):
+    ''' Great circle distance [km] between points given in degrees, and optionally
+    the initial bearing from point 1 to point 2 [degrees clockwise from north].
+
+    Inputs broadcast against each other like any numpy ufunc, so one call covers
+    e.g. a whole (init, member, lead) ensemble against a (init, 1, lead) best track.
+    The haversine (arcsin) form is used as it stays accurate down to metre
+    separations, where the spherical law of cosines (arccos) loses precision.
+
+    dtype=np.float32 halves memory and bandwidth for very large batches
+    (distances then good to a few tens of metres).
+    out is a preallocated array of the broadcast shape (a (dist, brng) pair if
+    bearing) which is filled in place and returned, to avoid allocating the
+    result of every call in tight loops.
+    '''
+    rad = np.pi / 180
+    lat1, lon1, lat2, lon2 = ( np.asarray(x, dtype=dtype) for x in (lat1, lon1, lat2, lon2) )
+    shape = np.broadcast_shapes( lat1.shape, lon1.shape, lat2.shape, lon2.shape )
+    if out is None:
+        dist = np.empty( shape, dtype=dtype )
+        brng = np.empty( shape, dtype=dtype ) if bearing else None
+    elif bearing:
+        dist, brng = out
+    else:
+        dist, brng = out, None
+    phi1 = lat1 * rad
+    phi2 = lat2 * rad
+    dlam = (lon2 - lon1) * rad
+    cos1 = np.cos( phi1 )
+    cos2 = np.cos( phi2 )
+    # h = sin^2(dphi/2) + cos(phi1) cos(phi2) sin^2(dlam/2), built up in dist
+    np.subtract( phi2, phi1, out=dist, casting='unsafe' )
+    dist *= 0.5
+    np.sin( dist, out=dist )
+    np.square( dist, out=dist )
+    tmp = np.empty( shape, dtype=dtype )
+    np.multiply( dlam, 0.5, out=tmp )
+    np.sin( tmp, out=tmp )
+    np.square( tmp, out=tmp )
+    tmp *= cos1
+    tmp *= cos2
+    dist += tmp
+    np.clip( dist, 0, 1, out=dist )
+    np.sqrt( dist, out=dist )
+    np.arcsin( dist, out=dist )
+    dist *= 2 * EARTH_RADIUS
+    if not bearing:
+        return dist
+    # x (east) and y (north) components of the initial heading
+    np.sin( dlam, out=tmp )
+    tmp *= cos2
+    north = cos1 * np.sin( phi2 ) - np.sin( phi1 ) * cos2 * np.cos( dlam )
+    np.arctan2( tmp, north, out=brng, casting='unsafe' )
+    brng /= rad
+    return dist, brng
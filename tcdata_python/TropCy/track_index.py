@@ -0,0 +1,164 @@
+"""SQLite index over converted track csvs for storm/init/tech/lead lookups"""
+# Track index module
+# pylint: disable=W0311, C0326, C0103
+#
+# Finding forecasts used to mean listing directories and parsing filenames.
+# update_index scans the csv trees once and records every file (path, storm,
+# year, basin, number, init time, row count), the techs it holds and its fixes
+# in a local SQLite database. Files whose size and mtime have not changed are
+# skipped, so re-running after new data arrives only reads the new files.
+# find_files / find_rows then answer queries without touching the csv trees, e.g.
+# all 72h ECMF forecasts initialised within 3 days of a landfall time:
+#   find_rows(db, storm='Laura', init=(landfall - 3 days, landfall + 3 days), tech='ECMF', tau=72)
+import os
+import sqlite3
+import pandas as pd
+from .track_store import read_track_csv, track_files
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+  id INTEGER PRIMARY KEY,
+  path TEXT UNIQUE NOT NULL,
+  size INTEGER NOT NULL,
+  mtime_ns INTEGER NOT NULL,
+  storm TEXT,
+  year INTEGER,
+  basin TEXT,
+  number INTEGER,
+  init TEXT,
+  nrows INTEGER
+);
+CREATE TABLE IF NOT EXISTS techs (
+  file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+  tech TEXT NOT NULL,
+  nrows INTEGER,
+  max_tau INTEGER
+);
+CREATE TABLE IF NOT EXISTS fixes (
+  file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+  tech TEXT NOT NULL,
+  tau INTEGER NOT NULL,
+  lat REAL, lon REAL, vmax REAL, mslp REAL
+);
+CREATE INDEX IF NOT EXISTS files_storm ON files(storm, year);
+CREATE INDEX IF NOT EXISTS files_init ON files(init);
+CREATE INDEX IF NOT EXISTS techs_file ON techs(file_id, tech);
+CREATE INDEX IF NOT EXISTS fixes_file ON fixes(file_id, tech, tau);
+"""
+
+def _timestr(x):
+  """Init times are stored as ISO text so they sort and compare as strings"""
+  return pd.Timestamp(x).strftime('%Y-%m-%d %H:%M:%S')
+
+def _as_list(x):
+  """Allow single values as well as lists for filters"""
+  if isinstance(x, (str, int)) or not hasattr(x, '__iter__'):
+    return [x]
+  return list(x)
+
+def connect(dbpath):
+  """Open (creating if needed) the index database at dbpath"""
+  con = sqlite3.connect(os.path.expanduser(dbpath))
+  con.execute('PRAGMA foreign_keys = ON')
+  con.executescript(SCHEMA)
+  return con
+
+def _index_file(con, fname, stat):
+  """(Re)insert one csv, replacing anything indexed for it before"""
+  con.execute('DELETE FROM files WHERE path = ?', (fname,))
+  datum = read_track_csv(fname)
+  first = datum.iloc[0] if len(datum) else None
+  cur = con.execute('INSERT INTO files (path, size, mtime_ns, storm, year, basin, number, init, nrows) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    (fname, stat.st_size, stat.st_mtime_ns,
+                     *( (first['storm'], int(first['year']), first['basin'], int(first['number']),
+                         _timestr(first['time'])) if first is not None else (None,)*5 ),
+                     len(datum)))
+  file_id = cur.lastrowid
+  techs = datum.groupby('model')['forecastHr'].agg(['size', 'max'])
+  con.executemany('INSERT INTO techs VALUES (?, ?, ?, ?)',
+                  [(file_id, tech, int(n), int(tau)) for tech, (n, tau) in techs.iterrows()])
+  con.executemany('INSERT INTO fixes VALUES (?, ?, ?, ?, ?, ?, ?)',
+                  zip([file_id]*len(datum), datum['model'], datum['forecastHr'].astype(int).tolist(),
+                      *(datum[col].astype(float).tolist() for col in ['lat', 'lon', 'vmax', 'mslp'])))
+
+def update_index(dbpath, paths):
+  """Bring the index at dbpath up to date with the csvs under paths
+
+  paths may be csv files, storm directories or trees of storm directories.
+  Only new or changed (size or mtime) files are read. Indexed files under
+  paths that no longer exist are dropped.
+  Returns (indexed, skipped, removed) file counts.
+  """
+  files = [os.path.abspath(fname) for fname in track_files(paths)]
+  roots = [os.path.abspath(path) for path in _as_list(paths)]
+  indexed = skipped = removed = 0
+  con = connect(dbpath)
+  try:
+    with con:
+      known = {path: (size, mtime) for path, size, mtime in con.execute('SELECT path, size, mtime_ns FROM files')}
+      for fname in files:
+        stat = os.stat(fname)
+        if known.get(fname) == (stat.st_size, stat.st_mtime_ns):
+          skipped += 1
+          continue
+        _index_file(con, fname, stat)
+        indexed += 1
+      present = set(files)
+      for path in known:
+        if path not in present and any(path == root or path.startswith(root + os.sep) for root in roots):
+          con.execute('DELETE FROM files WHERE path = ?', (path,))
+          removed += 1
+  finally:
+    con.close()
+  return indexed, skipped, removed
+
+def _where(storm=None, year=None, basin=None, init=None, tech=None, tau=None):
+  """SQL where clause and parameters shared by the queries
+  Each filter takes a single value or a list, init is a (start, end) pair
+  of anything pd.Timestamp understands and either end may be None"""
+  clauses, params = [], []
+  for column, value in [('f.storm', storm), ('f.year', year), ('f.basin', basin), ('t.tech', tech), ('x.tau', tau)]:
+    if value is not None:
+      values = _as_list(value)
+      if column == 'f.basin':
+        values = [v.upper() for v in values]
+      clauses.append(f"{column} IN ({','.join('?'*len(values))})")
+      params += values
+  if init is not None:
+    start, end = init
+    if start is not None:
+      clauses.append('f.init >= ?')
+      params.append(_timestr(start))
+    if end is not None:
+      clauses.append('f.init <= ?')
+      params.append(_timestr(end))
+  return (' WHERE ' + ' AND '.join(clauses) if clauses else ''), params
+
+def find_files(dbpath, storm=None, year=None, basin=None, init=None, tech=None):
+  """Paths of indexed csvs matching the filters, in init time order
+  tech matches files holding at least one fix for any of the given techs"""
+  where, params = _where(storm=storm, year=year, basin=basin, init=init, tech=tech)
+  join = ' JOIN techs t ON t.file_id = f.id' if tech is not None else ''
+  con = connect(dbpath)
+  try:
+    rows = con.execute(f'SELECT DISTINCT f.path, f.init FROM files f{join}{where} ORDER BY f.init, f.path', params)
+    return [path for path, _ in rows]
+  finally:
+    con.close()
+
+def find_rows(dbpath, storm=None, year=None, basin=None, init=None, tech=None, tau=None):
+  """Indexed forecast fixes matching the filters as a DataFrame
+  Columns follow the csvs (time, model, forecastHr, ...) plus storm, year and path"""
+  where, params = _where(storm=storm, year=year, basin=basin, init=init, tech=tech, tau=tau)
+  where = where.replace('t.tech', 'x.tech')
+  query = ('SELECT f.storm, f.year, f.basin, f.number, f.init AS time, x.tech AS model, x.tau AS forecastHr, '
+           'x.lat, x.lon, x.vmax, x.mslp, f.path FROM fixes x JOIN files f ON x.file_id = f.id'
+           f'{where} ORDER BY f.init, x.tech, x.tau')
+  con = connect(dbpath)
+  try:
+    datum = pd.read_sql_query(query, con, params=params)
+  finally:
+    con.close()
+  datum['time'] = pd.to_datetime(datum['time'])
+  return datum
@@ -0,0 +1,143 @@
+"""Parquet store of converted track csvs partitioned by year/basin/storm"""
+# Track store module
+# pylint: disable=W0311, C0326, C0103
+#
+# The csv trees (cxml2012/, cxml2020/, tcTracks/, tcTracksCleaned/) hold one
+# small file per storm per init time. Listing and opening them all is most of
+# the cost of a rerun, so write_store packs every fix into a hive partitioned
+# Parquet dataset (root/year=2020/basin=AL/storm=Laura/...) and read_store only
+# opens the partitions and row groups that can match its filters. Partitions
+# are merged, so files can be added a few at a time.
+# pyarrow is only imported when the store is used.
+import glob
+import os
+import pandas as pd
+
+# data columns kept from the csvs, basin is a partition key
+STORE_COLUMNS = ['number', 'time', 'model', 'forecastHr', 'lat', 'lon', 'vmax', 'mslp']
+PARTITIONS = ['year', 'basin', 'storm']
+# a fix is unique on its partition, init time, model (member) and lead
+FIX_KEY = PARTITIONS + ['time', 'model', 'forecastHr']
+
+def _import_pyarrow():
+  """pyarrow is only needed for the store, import on demand"""
+  try:
+    import pyarrow
+    import pyarrow.dataset
+  except ImportError as err:
+    raise ImportError('pyarrow is required for the Parquet track store (pip install pyarrow)') from err
+  return pyarrow
+
+def _schema(pa):
+  """Arrow schema of the stored columns, partition keys last"""
+  return pa.schema([('number', pa.int16()), ('time', pa.timestamp('s')), ('model', pa.string()),
+                    ('forecastHr', pa.int16()), ('lat', pa.float32()), ('lon', pa.float32()),
+                    ('vmax', pa.float32()), ('mslp', pa.float32()),
+                    ('year', pa.int16()), ('basin', pa.string()), ('storm', pa.string())])
+
+def _partitioning(pa):
+  schema = _schema(pa)
+  return pa.dataset.partitioning(pa.schema([schema.field(key) for key in PARTITIONS]), flavor='hive')
+
+def track_files(paths):
+  """Expand files, storm directories and trees of storm directories into csv paths"""
+  if isinstance(paths, str):
+    paths = [paths]
+  files = []
+  for path in paths:
+    if os.path.isdir(path):
+      files += glob.glob(os.path.join(path, '*.csv')) + glob.glob(os.path.join(path, '*', '*.csv'))
+    else:
+      files.append(path)
+  return sorted(files)
+
+def read_track_csv(fname):
+  """Read one converted csv (Name-YYYY-MM-DD-HH.csv) into store columns
+  The storm name and year come from the filename, split from the right
+  as names may themselves contain dashes (e.g. KAI-TAK-2012-08-14-00.csv)"""
+  datum = pd.read_csv(fname, skipinitialspace=True, usecols=['basin'] + STORE_COLUMNS,
+                      dtype={'basin': str, 'model': str})
+  storm, year = os.path.basename(fname).rsplit('-', 4)[:2]
+  datum['time'] = pd.to_datetime(datum['time'].astype(str), format='%Y%m%d%H')
+  datum['basin'] = datum['basin'].str.strip().str.upper()
+  datum['model'] = datum['model'].str.strip()
+  datum['storm'] = storm
+  datum['year'] = int(year)
+  return datum
+
+def _stored_rows(pa, root, keys):
+  """Rows already in the store for the year/basin/storm partitions in keys"""
+  if not os.path.isdir(root):
+    return None
+  field = pa.dataset.field
+  expr = None
+  for year, basin, storm in keys.itertuples(index=False):
+    new = (field('year') == year) & (field('basin') == basin) & (field('storm') == storm)
+    expr = new if expr is None else expr | new
+  dataset = pa.dataset.dataset(root, format='parquet', partitioning=_partitioning(pa))
+  return dataset.to_table(filter=expr).to_pandas()
+
+def write_store(paths, root):
+  """Add converted track csvs to the Parquet store at root
+
+  paths may be csv files, storm directories or a tree of storm directories.
+  Each year/basin/storm partition touched is rewritten with what it already
+  held merged with the new rows, one row per fix (FIX_KEY). A fix already
+  stored is replaced by the new one, and of duplicates among the new files
+  the last in track_files order is kept.
+  Rows are sorted on init time, model and lead so the row group statistics
+  let read_store skip data outside an init range or tech list.
+  Returns the number of rows in the partitions written.
+  """
+  pa = _import_pyarrow()
+  files = track_files(paths)
+  if not files:
+    return 0
+  datum = pd.concat([read_track_csv(fname) for fname in files], ignore_index=True)
+  stored = _stored_rows(pa, root, datum[PARTITIONS].drop_duplicates())
+  if stored is not None and len(stored):
+    datum = pd.concat([stored, datum], ignore_index=True)
+  datum = datum.drop_duplicates(FIX_KEY, keep='last')
+  datum = datum.sort_values(FIX_KEY, kind='stable')
+  schema = _schema(pa)
+  table = pa.Table.from_pandas(datum[schema.names], schema=schema, preserve_index=False)
+  pa.dataset.write_dataset(table, root, format='parquet', partitioning=_partitioning(pa),
+                           existing_data_behavior='delete_matching',
+                           basename_template='part-{i}.parquet')
+  return len(datum)
+
+def store_filter(storm=None, year=None, basin=None, init=None, tech=None):
+  """Build the pyarrow filter expression used by read_store
+  Each argument takes a single value or a list, init is a (start, end)
+  pair of anything pd.Timestamp understands, either end may be None"""
+  pa = _import_pyarrow()
+  field = pa.dataset.field
+  expr = None
+  def _and(expr, new):
+    return new if expr is None else expr & new
+  for name, value in [('storm', storm), ('year', year), ('basin', basin), ('model', tech)]:
+    if value is not None:
+      values = [value] if isinstance(value, (str, int)) else list(value)
+      if name == 'basin':
+        values = [v.upper() for v in values]
+      expr = _and(expr, field(name).isin(values))
+  if init is not None:
+    start, end = init
+    if start is not None:
+      expr = _and(expr, field('time') >= pa.scalar(pd.Timestamp(start).to_pydatetime(), pa.timestamp('s')))
+    if end is not None:
+      expr = _and(expr, field('time') <= pa.scalar(pd.Timestamp(end).to_pydatetime(), pa.timestamp('s')))
+  return expr
+
+def read_store(root, storm=None, year=None, basin=None, init=None, tech=None, columns=None):
+  """Read forecast fixes from the Parquet store at root into a DataFrame
+
+  storm, year and basin prune whole partition directories without opening
+  them, init (start, end) and tech (the model column, e.g. ECMF or EE01)
+  are pushed down to skip row groups. columns limits what is read.
+  """
+  pa = _import_pyarrow()
+  dataset = pa.dataset.dataset(root, format='parquet', partitioning=_partitioning(pa))
+  expr = store_filter(storm=storm, year=year, basin=basin, init=init, tech=tech)
+  table = dataset.to_table(columns=columns, filter=expr)
+  return table.to_pandas()
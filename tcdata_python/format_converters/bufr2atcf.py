@@ -154,19 +154,15 @@ if __name__ == '__main__':
     msg = bufrpy.decode_file(open(bufr_fname, 'rb'), table)
     alldata = bufr_to_data(msg)
     
-    with open(bufr_out, 'a') as fout:
-        for subset in alldata:
-            basin = which_basin(subset)
-            for index,datum in subset.iterrows():
-                    if( pd.notnull(datum.get_value('lon')) ):
-                        fout.write( atcf.line_out(basin, int(subset['STORM IDENTIFIER'][0][:2]), 
-                            subset['date'][0], 
-                            to_tech(subset),
-                            datum['tau'], datum['lat'], datum['lon'], datum['vmax']*1.94384, datum['mslp']/100., TY='XX')
-                        )
-    try:
-        os.system("sort -u -k 3,3n -k 5,5 -k 6,6n "+bufr_out+" -o "+bufr_out)
-    except:
-        print("File may contain duplicates")
-
-
+    lines = []
+    for subset in alldata:
+        basin = which_basin(subset)
+        for index,datum in subset.iterrows():
+                if( pd.notnull(datum.get_value('lon')) ):
+                    lines.append( atcf.line_out(basin, int(subset['STORM IDENTIFIER'][0][:2]), 
+                        subset['date'][0], 
+                        to_tech(subset),
+                        datum['tau'], datum['lat'], datum['lon'], datum['vmax']*1.94384, datum['mslp']/100., TY='XX')
+                    )
+    # Order by date, tech, tau and drop duplicates before a single write
+    atcf.write_adeck(bufr_out, lines, append=True)
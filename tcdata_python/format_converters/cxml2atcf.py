@@ -1,33 +1,38 @@
-import xml.etree.ElementTree as ET
 import sys
 sys.path.append(sys.path[0]+'/..')
 print(sys.path)
 import os, glob
+import multiprocessing
+import traceback
+import xml.etree.ElementTree as ET
 import TIGGE2012Download as dl
 from TropCy import atcf
 from TropCy import cxml
 #from datetime import datetime
-#import traceback
 # pylint: disable=W0311, C0326, C0103, C0301
 
 def save_atcf(basin, number, time, data, fid):
     outstr = atcf.line_out( basin, number, time, data['tech'], data['fhr'], data['lat'] , data['lon'], data['vmax'], data['mslp'] )
     fid.write(outstr)
 
+CSV_HEADER = "basin,number,time,tech,model,forecastHr,lat,lon,vmax,mslp,\n"
+
 def csv_headers(fid):
-    outstr = "basin,number,time,tech,model,forecastHr,lat,lon,vmax,mslp,\n"
-    fid.write(outstr)
+    fid.write(CSV_HEADER)
 
-def cxml2atcf(fname):
-  """Read all forecasts for non errored storms and save to appropriate adeck file"""
+def cxml2records(fname):
+  """Decode all forecasts for non errored storms into records keyed by output adeck filename
+
+  Each record is a (basin, number, time, data) tuple as taken by save_atcf.
+  Nothing is written here so that this can be run in worker processes.
+  """
+  records = {}
   if not os.path.isfile(fname):
       print("No file found -- "+fname)
-      return
-  tree = ET.parse(fname)
-  xml_root = tree.getroot()
-  ##  Get analysis info from xml.  Defines the storms that exist
+      return records
+  ##  Decode the whole xml in a single streaming pass.  Analysis info defines the storms that exist
   ## Name is optional here and may be empty for TDs
-  anl_data = cxml.get_analysis(xml_root)
+  anl_data, forecasts = cxml.decode_file(fname)
 
   cyNo = [ atcf.basin2short(anl_data[idi]['basin'])+str(anl_data[idi]['number']) for idi in anl_data ]
   cyCount = [cyNo.count(num) for num in cyNo]
@@ -44,31 +49,53 @@ def cxml2atcf(fname):
     if storm['number'] >= 70:
       continue
     out_fname = atcf.filename(storm['name'],storm['basin'], storm['number'], storm['time'] )
+    storm_records = records.setdefault(out_fname, [])
+    for tech, ensNo in [("ECMF", -999)] + [("EE%02.0f"%ensNo, ensNo) for ensNo in range(0,51,1)]:
+      for fhr in range(0,144+6,6):
+        if (idi, tech, fhr) in forecasts:
+          storm_records.append( (storm['basin'], storm['number'], storm['time'], forecasts[(idi, tech, fhr)]) )
+  return records
+
+def write_records(out_fname, records, mode='w'):
+    """Write header and records to adeck file ordered by date, tech, fhr and unique
+    mode='a' merges with whatever is already in the file"""
     print(out_fname)
-    fOut = open(out_fname, 'a')
+    lines = [atcf.line_out( basin, number, time, data['tech'], data['fhr'], data['lat'] , data['lon'], data['vmax'], data['mslp'] )
+             for basin, number, time, data in records]
+    atcf.write_adeck(out_fname, lines, header=CSV_HEADER, append=(mode == 'a'))
 
-    csv_headers(fOut)
+def cxml2atcf(fname):
+  """Read all forecasts for non errored storms and save to appropriate adeck file"""
+  for out_fname, records in cxml2records(fname).items():
+    write_records(out_fname, records, mode='a')
 
-    for fhr in range(0,144+6,6):
-      try:
-        data = cxml.get_forecasts( xml_root, "forecast", idi, -999, fhr)
-        save_atcf(storm['basin'], storm['number'], storm['time'], data, fOut)
-      except:
-        pass
-    for ensNo in range(0,51,1):
-      for fhr in range(0,144+6,6):
-        try:
-          data = cxml.get_forecasts( xml_root, "ensembleForecast", idi, ensNo, fhr)
-          save_atcf(storm['basin'], storm['number'],  storm['time'], data, fOut)
-        except:
-          pass
-    fOut.close()
-    ## This could be done in python but sort is easier.
-    ## Make sure the columns are ordered by date, tech, fhr and are unique
-    try:
-     os.system("sort -u -k 3,3n -k 5,5 -k 6,6n "+out_fname+" -o "+out_fname)
-    except:
-     print("File may contain duplicates")
+def _decode_worker(fname):
+  """Pool worker -- never let one bad file take down the whole batch"""
+  try:
+    return fname, cxml2records(fname)
+  except ET.ParseError as e:
+    print("Failed to parse "+fname+" -- "+str(e))
+    return fname, {}
+
+def batch_convert(files, outpath=".", processes=None):
+  """Convert many cxml files across a process pool
+
+  Workers decode files and hand back records, these are merged per storm and
+  each adeck file is written exactly once after all files are decoded.
+  processes defaults to the number of cpus (see multiprocessing.Pool).
+  Returns list of files written.
+  """
+  merged = {}
+  with multiprocessing.Pool(processes) as pool:
+    # sorted input and imap keeps merge order deterministic
+    for fname, records in pool.imap(_decode_worker, sorted(files)):
+      for out_fname, storm_records in records.items():
+        merged.setdefault(out_fname, []).extend(storm_records)
+  written = []
+  for out_fname in sorted(merged):
+    write_records(os.path.join(outpath, out_fname), merged[out_fname])
+    written.append(os.path.join(outpath, out_fname))
+  return written
 
 
 #  run the main code if called as a script
@@ -86,9 +113,8 @@ if __name__ == "__main__":
     inpath = "/Users/laratobias-tarsh/Documents/clim323-final/tcdata_python/format_converters"
     outpath = "/Users/laratobias-tarsh/Documents/clim323-final/cxml2012"
     files = glob.glob(inpath + pattern)
-    
-    for fname in files:
-      cxml2atcf(fname)
+
+    batch_convert(files, outpath=inpath, processes=os.cpu_count())
     dl.organise(inpath,inpath)
    except Exception:
      exc_info = sys.exc_info()